@@ -0,0 +1,177 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+'''
+
+    Benchmark cases for the emulator's hot paths. All cases use the contracts
+    shipped with tutorials, so no network access or compiler is needed.
+
+    Each case returns a dictionary of metrics. Metrics with `_per_sec` suffix
+    are "higher is better", all the others are "lower is better".
+
+'''
+
+import os
+import sys
+import time
+import resource
+import subprocess
+
+import tonos_ts4.ts4 as ts4
+
+
+CONTRACTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tutorials', 'contracts')
+
+CASES = dict()
+
+def case(name):
+    def register(fn):
+        CASES[name] = fn
+        return fn
+    return register
+
+def setup():
+    ts4.reset_all()
+    ts4.init(CONTRACTS, verbose = False)
+
+def latency(samples):
+    samples = sorted(samples)
+    def pct(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1e6
+    return dict(
+        mean_us = sum(samples) / len(samples) * 1e6,
+        p50_us  = pct(0.50),
+        p95_us  = pct(0.95),
+        calls_per_sec = len(samples) / sum(samples),
+    )
+
+def measure(fn, n):
+    samples = []
+    for i in range(n):
+        t = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t)
+    return samples
+
+def rss_kb():
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def startup_time(code, n):
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    samples = []
+    for _ in range(n):
+        t = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd = root, check = True)
+        samples.append(time.perf_counter() - t)
+    return min(samples) * 1000
+
+@case('startup')
+def bench_startup(scale):
+    n = 5 * scale
+    python_ms = startup_time('pass', n)
+    import_ms = startup_time('import tonos_ts4.ts4', n)
+    core_ms   = startup_time('import tonos_ts4.ts4 as ts4; ts4.core.load()', n)
+    return dict(
+        import_ms       = import_ms - python_ms,
+        core_load_ms    = core_ms - import_ms,
+    )
+
+@case('deploy')
+def bench_deploy(scale):
+    setup()
+    n = 200 * scale
+    def deploy(i):
+        ts4.BaseContract('tutorial01', {},
+            override_address = ts4.Address('0:{:064x}'.format(i + 1)))
+    t = time.perf_counter()
+    measure(deploy, n)
+    elapsed = time.perf_counter() - t
+    return dict(deploys_per_sec = n / elapsed)
+
+@case('external_call')
+def bench_external_call(scale):
+    setup()
+    tut02 = ts4.BaseContract('tutorial02', {})
+    samples = measure(lambda i: tut02.call_method('set_number', dict(value = i)), 500 * scale)
+    return latency(samples)
+
+@case('getter_small')
+def bench_getter_small(scale):
+    setup()
+    tut01 = ts4.BaseContract('tutorial01', {})
+    samples = measure(lambda i: tut01.call_getter('m_number'), 500 * scale)
+    return latency(samples)
+
+@case('getter_large')
+def bench_getter_large(scale):
+    setup()
+    tut02 = ts4.BaseContract('tutorial02', {})
+    tut02.call_method('set_array', dict(value = [i % 256 for i in range(1000)]))
+    samples = measure(lambda i: tut02.call_getter('m_array'), 100 * scale)
+    return latency(samples)
+
+def deploy_neighbors():
+    alice = ts4.BaseContract('tutorial04_1', {})
+    bob   = ts4.BaseContract('tutorial04_2', {})
+    return (alice, bob)
+
+@case('dispatch')
+def bench_dispatch(scale):
+    setup()
+    (alice, bob) = deploy_neighbors()
+    n = 200 * scale
+    messages = 0
+    elapsed = 0
+    for i in range(n):
+        alice.call_method('ping_neighbor', dict(neighbor = bob.addr, value = i))
+        t = time.perf_counter()
+        while len(ts4.globals.QUEUE) > 0:
+            ts4.dispatch_one_message()
+            messages += 1
+        elapsed += time.perf_counter() - t
+    ts4.globals.EVENTS.clear()
+    return dict(messages_per_sec = messages / elapsed)
+
+@case('events')
+def bench_events(scale):
+    setup()
+    (alice, bob) = deploy_neighbors()
+    n = 200 * scale
+    t = time.perf_counter()
+    for i in range(n):
+        alice.call_method('ping_neighbor', dict(neighbor = bob.addr, value = i))
+        ts4.dispatch_messages()
+    elapsed = time.perf_counter() - t
+    events = len(ts4.globals.EVENTS)
+    assert events == 2 * n, events
+    return dict(events_per_sec = events / elapsed, scenarios_per_sec = n / elapsed)
+
+@case('memory')
+def bench_memory(scale):
+    setup()
+    (alice, bob) = deploy_neighbors()
+    n = 1000 * scale
+    # warm up
+    for i in range(100):
+        alice.call_method('ping_neighbor', dict(neighbor = bob.addr, value = i))
+        ts4.dispatch_messages()
+    ts4.globals.EVENTS.clear()
+    rss0 = rss_kb()
+    for i in range(n):
+        alice.call_method('ping_neighbor', dict(neighbor = bob.addr, value = i))
+        ts4.dispatch_messages()
+        ts4.globals.EVENTS.clear()
+    growth = rss_kb() - rss0
+    return dict(rss_growth_kb = growth, rss_growth_kb_per_1000_calls = growth * 1000 / n)
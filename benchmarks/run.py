@@ -0,0 +1,121 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+'''
+
+    Runs the benchmark suite and optionally compares results with a baseline.
+
+        python benchmarks/run.py                                # all cases
+        python benchmarks/run.py getter_small dispatch          # selected cases
+        python benchmarks/run.py --output results.json
+        python benchmarks/run.py --save-baseline baseline.json
+        python benchmarks/run.py --baseline baseline.json --threshold 0.15
+
+    Exits with code 1 when some metric regressed by more than the threshold.
+
+'''
+
+import os
+import sys
+import json
+import argparse
+import platform
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import tonos_ts4.ts4 as ts4
+
+from cases import CASES
+
+
+def higher_is_better(metric):
+    return metric.endswith('_per_sec')
+
+def run(names, scale, repeat):
+    results = dict()
+    for name in names:
+        best = None
+        for _ in range(repeat):
+            res = CASES[name](scale)
+            if best is None:
+                best = res
+            else:
+                for metric, value in res.items():
+                    better = value > best[metric] if higher_is_better(metric) else value < best[metric]
+                    if better:
+                        best[metric] = value
+        results[name] = best
+        print('{:<16} {}'.format(name, ', '.join(
+            '{} = {:.1f}'.format(k, v) for k, v in best.items())), file = sys.stderr)
+    return results
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, metrics in results.items():
+        for metric, value in metrics.items():
+            base = baseline.get(name, dict()).get(metric)
+            if base is None or base == 0:
+                continue
+            change = (value - base) / abs(base)
+            regressed = -change > threshold if higher_is_better(metric) else change > threshold
+            print('{:<16} {:<30} {:>12.1f} {:>12.1f} {:>+8.1%}  {}'.format(
+                name, metric, base, value, change, 'REGRESSION' if regressed else 'ok'), file = sys.stderr)
+            if regressed:
+                regressions.append((name, metric))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description = 'TestSuite4 benchmarks')
+    parser.add_argument('cases', nargs = '*', help = 'Cases to run: {}'.format(', '.join(CASES)))
+    parser.add_argument('--scale', type = int, default = 1, help = 'Multiplier for the number of iterations')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'Number of runs; the best one is reported')
+    parser.add_argument('--output', help = 'Write results to this JSON file (stdout by default)')
+    parser.add_argument('--save-baseline', help = 'Store results as a baseline')
+    parser.add_argument('--baseline', help = 'Compare results with a stored baseline')
+    parser.add_argument('--threshold', type = float, default = 0.1,
+        help = 'Relative change treated as a regression (0.1 by default)')
+    args = parser.parse_args()
+
+    names = args.cases or list(CASES)
+    for name in names:
+        if name not in CASES:
+            parser.error("Unknown case '{}'".format(name))
+
+    report = dict(
+        env = dict(
+            ts4         = ts4.__version__,
+            python      = platform.python_version(),
+            platform    = platform.platform(),
+            scale       = args.scale,
+        ),
+        results = run(names, args.scale, args.repeat),
+    )
+
+    out = json.dumps(report, indent = 2)
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            print(out, file = f)
+    else:
+        print(out)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, 'w') as f:
+            print(out, file = f)
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['env']['scale'] != args.scale:
+            print('Warning: baseline was recorded with scale = {}'.format(baseline['env']['scale']), file = sys.stderr)
+        if compare(report['results'], baseline['results'], args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
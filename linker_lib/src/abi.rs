@@ -7,14 +7,17 @@
     Copyright 2019-2021 (c) TON LABS
 */
 
-use std::collections::HashMap;
+use std::sync::Arc;
+use std::collections::{BTreeSet, HashMap};
+
+use pyo3::FromPyObject;
 
 use ed25519_dalek::{
     Keypair, PublicKey, /*SecretKey*/
 };
 
 use ton_types::{
-    SliceData, BuilderData,
+    SliceData, BuilderData, Cell,
 };
 
 use ton_block::{
@@ -22,6 +25,10 @@ use ton_block::{
     StateInit,
 };
 
+use ton_abi::token::{
+    Detokenizer, TokenValue,
+};
+
 use ton_abi::json_abi::{
     encode_function_call,
     decode_function_response,
@@ -37,37 +44,125 @@ use crate::messages::{
     MsgAbiInfo,
 };
 
+/// ABI passed from Python: a handle returned by `load_abi()` or a file name.
+#[derive(FromPyObject)]
+pub enum AbiRef {
+    Handle(u32),
+    File(String),
+}
+
+/// Loaded ABIs are addressed by handles, which stay valid for the whole
+/// process (`reset_all` only drops the set of registered ABIs). An ABI is
+/// parsed once per content: loading a changed file gives a new handle.
 #[derive(Default)]
 pub struct AllAbis {
-    all_abis: HashMap<String, AbiInfo>,
+    /// File name -> handle of its most recently loaded content
+    handles: HashMap<String, u32>,
+    loaded: Vec<Arc<AbiInfo>>,
+    registered: BTreeSet<u32>,
+    /// Function ID -> handles of the ABIs declaring such a function
+    by_function_id: HashMap<u32, Vec<u32>>,
+    /// ABIs which failed to parse are always tried one by one
+    unindexed: Vec<u32>,
 }
 
 impl AllAbis {
-    pub fn register_abi(&mut self, abi: AbiInfo) {
-        self.all_abis.insert(abi.filename.clone(), abi);
+    fn insert(&mut self, mut abi: AbiInfo) -> u32 {
+        let handle = self.loaded.len() as u32;
+        abi.handle = Some(handle);
+        if !abi.text.is_empty() {
+            match abi.contract() {
+                Some(contract) => for f in contract.functions().values() {
+                    self.by_function_id.entry(f.get_input_id()).or_default().push(handle);
+                },
+                None => self.unindexed.push(handle),
+            }
+        }
+        self.handles.insert(abi.filename.clone(), handle);
+        self.loaded.push(Arc::new(abi));
+        handle
+    }
+
+    /// Registers ABI for decoding of messages with unknown destination ABI
+    pub fn register_abi(&mut self, abi: Arc<AbiInfo>) {
+        let handle = match abi.handle {
+            Some(handle) => handle,
+            None => self.load_text(abi.filename.clone(), abi.text.clone()),
+        };
+        self.registered.insert(handle);
     }
 
-    fn values(&self) -> Vec<String> {
-        self.all_abis.iter().map(|pair| pair.1.text().clone()).collect()
+    pub fn clear_registered(&mut self) {
+        self.registered.clear();
     }
 
-    fn decode_function_call(&self, body: &SliceData, internal: bool) -> Option<ton_abi::DecodedMessage> {
-        for abi_str in self.values() {
-            // println!("contract: {}", &contract.name);
-            let res = decode_unknown_function_call(abi_str, body.clone(), internal);
-            if let Ok(res) = res {
-                return Some(res);
+    /// Decodes a call to a function of any registered ABI. Internal message bodies
+    /// start with function ID, so only ABIs declaring this function are tried.
+    /// Position of the ID in external bodies depends on ABI headers, so all ABIs are tried.
+    /// Returns function name and decoded parameters.
+    fn decode_function_call(&self, body: &SliceData, internal: bool) -> Option<(String, String)> {
+        let function_id = body.clone().get_next_u32().ok();
+        let candidates: Vec<u32> = match function_id {
+            Some(id) if internal => self.by_function_id.get(&id).into_iter().flatten()
+                .chain(self.unindexed.iter())
+                .cloned().collect(),
+            _ => self.registered.iter().cloned().collect(),
+        };
+        for handle in candidates {
+            if !self.registered.contains(&handle) {
+                continue;
+            }
+            let abi_info = &self.loaded[handle as usize];
+            let res = match abi_info.contract() {
+                Some(contract) => decode_call(contract, function_id, body.clone(), internal),
+                None => decode_unknown_function_call(abi_info.text().clone(), body.clone(), internal)
+                    .ok().map(|res| (res.function_name, res.params)),
+            };
+            if res.is_some() {
+                return res;
             }
         }
         None
     }
 
-    pub fn from_file(&mut self, filename: &String) -> Result<AbiInfo, String> {
-        if !self.all_abis.contains_key(filename) {
-            let info = AbiInfo::from_file(filename.clone())?;
-            self.register_abi(info);
+    /// Loads ABI from a file and returns its handle. The file is read every time,
+    /// but it is parsed again only when its content has changed
+    pub fn load(&mut self, filename: &String) -> Result<u32, String> {
+        let text = load_abi_json_string(filename)?;
+        Ok(self.load_text(filename.clone(), text))
+    }
+
+    fn load_text(&mut self, filename: String, text: String) -> u32 {
+        if let Some(handle) = self.handles.get(&filename) {
+            if self.loaded[*handle as usize].text == text {
+                return *handle;
+            }
+        }
+        self.insert(AbiInfo::new(filename, text))
+    }
+
+    /// Returns ABI with a given file name and text, loaded ABI is reused only if its text is the same
+    pub fn from_text(&mut self, filename: String, text: String) -> Arc<AbiInfo> {
+        let handle = self.load_text(filename, text);
+        self.loaded[handle as usize].clone()
+    }
+
+    pub fn from_file(&mut self, filename: &String) -> Result<Arc<AbiInfo>, String> {
+        let handle = self.load(filename)?;
+        self.registered.insert(handle);
+        Ok(self.loaded[handle as usize].clone())
+    }
+
+    pub fn get(&mut self, abi: &AbiRef) -> Result<Arc<AbiInfo>, String> {
+        match abi {
+            AbiRef::Handle(handle) => {
+                let abi_info = self.loaded.get(*handle as usize).cloned()
+                    .ok_or(format!("Invalid ABI handle {}", handle))?;
+                self.registered.insert(*handle);
+                Ok(abi_info)
+            },
+            AbiRef::File(filename) => self.from_file(filename),
         }
-        Ok(self.all_abis[filename].clone())
     }
 
 }
@@ -76,22 +171,50 @@ impl AllAbis {
 pub struct AbiInfo {
     filename: String,
     text: String,
+    /// Parsed once when the ABI is loaded, `None` if the text is not a valid ABI
+    contract: Option<Arc<ton_abi::Contract>>,
+    /// Handle in `AllAbis`, `None` until the ABI is loaded there
+    handle: Option<u32>,
 }
 
 impl AbiInfo {
-    fn from_file(filename: String) -> Result<AbiInfo, String> {
-        let abi_str = load_abi_json_string(&filename)?;
-        let abi_info = AbiInfo {
-            filename: filename,
-            text: abi_str,
-        };
-        Ok(abi_info)
+    fn new(filename: String, text: String) -> AbiInfo {
+        let contract = ton_abi::Contract::load(text.as_bytes()).ok().map(Arc::new);
+        AbiInfo { filename, text, contract, handle: None }
+    }
+    pub fn contract(&self) -> Option<&ton_abi::Contract> {
+        self.contract.as_deref()
+    }
+    pub fn filename(&self) -> &String {
+        &self.filename
     }
     pub fn text(&self) -> &String {
         &self.text
     }
 }
 
+/// Decodes a function call with an already parsed ABI. Internal bodies are
+/// dispatched by function ID, external ones have the ID after ABI headers.
+fn decode_call(
+    contract: &ton_abi::Contract,
+    function_id: Option<u32>,
+    body: SliceData,
+    internal: bool,
+) -> Option<(String, String)> {
+    let (function_name, tokens) = match function_id {
+        Some(id) if internal => {
+            let function = contract.function_by_id(id, true).ok()?;
+            (function.name.clone(), function.decode_input(body, internal).ok()?)
+        },
+        _ => {
+            let decoded = contract.decode_input(body, internal).ok()?;
+            (decoded.function_name, decoded.tokens)
+        },
+    };
+    let params = Detokenizer::detokenize(&tokens).ok()?;
+    Some((function_name, params))
+}
+
 pub fn decode_body(
     gs: &GlobalState,
     abi_info: &AbiInfo,
@@ -129,9 +252,9 @@ pub fn decode_body(
     }
 
     // Check for a call to a remote method
-    if let Some(res) = gs.all_abis.decode_function_call(&body, internal) {
-        // println!(">> {} {}", res.function_name, res.params);
-        return MsgAbiInfo::create_call(res.params, res.function_name);
+    if let Some((function_name, params)) = gs.all_abis.decode_function_call(&body, internal) {
+        // println!(">> {} {}", function_name, params);
+        return MsgAbiInfo::create_call(params, function_name);
     }
 
     // Check for event
@@ -161,6 +284,27 @@ pub fn build_abi_body(
     ).map_err(|e| format!("cannot encode abi body: {:?}", e))
 }
 
+/// Decodes persistent data of a contract described by ABI `fields` section.
+/// `data` section describes the initial data dictionary, not the storage of
+/// a deployed contract, so it cannot be used here.
+pub fn decode_contract_data(abi_info: &AbiInfo, data: Cell) -> Result<String, String> {
+    let contract = match abi_info.contract() {
+        Some(contract) => contract,
+        None => return Err(match ton_abi::Contract::load(abi_info.text().as_bytes()) {
+            Err(e) => format!("cannot load abi: {}", e),
+            Ok(_) => format!("cannot load abi"),
+        }),
+    };
+    if contract.fields().is_empty() {
+        return Err(format!("ABI '{}' has no `fields` section describing contract data", abi_info.filename()));
+    }
+    let data: SliceData = data.into();
+    let tokens = TokenValue::decode_params(contract.fields(), data, &contract.abi_version(), false)
+        .map_err(|e| format!("cannot decode contract data: {}", e))?;
+    Detokenizer::detokenize(&tokens)
+        .map_err(|e| format!("cannot detokenize contract data: {}", e))
+}
+
 pub fn set_public_key(state_init: &mut StateInit, pubkey: String) -> Result<(), String> {
     let pubkey = hex::decode(pubkey)
         .map_err(|e| format!("cannot decode public key: {}", e))?;
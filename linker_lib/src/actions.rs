@@ -18,7 +18,7 @@ use ton_block::{
 };
 
 use crate::global_state::{
-    GlobalState, ContractInfo,
+    GlobalState,
 };
 
 use crate::messages::{
@@ -53,24 +53,22 @@ struct ActionsProcessor {
 
 pub fn process_actions(
     gs: &mut GlobalState,
-    mut contract_info: ContractInfo,
+    address: &MsgAddressInt,
     result: &ExecutionResult,
     method: Option<String>,
     msg_value: Option<u64>,
 ) -> Result<Vec<MsgInfo>, String> {
 
-    // let mut msg_value = msg_value.unwrap_or_default();
-
-    let address: &MsgAddressInt = contract_info.address();
-
-    let abi_info = contract_info.abi_info();
-    // let mut balance = contract_info.balance();
+    let (balance, abi_info) = {
+        let contract_info = gs.get_contract(address).unwrap();
+        (contract_info.balance(), contract_info.abi_info().clone())
+    };
 
     let mut msgs = vec![];
     let mut state = ActionsProcessor::default();
     state.verbose = gs.trace;
-    state.balance = contract_info.balance();
     state.msg_value = msg_value.unwrap_or_default();
+    state.balance = balance + state.msg_value;
 
     let info_ex = &result.info_ex;
 
@@ -83,20 +81,18 @@ pub fn process_actions(
         }
     }
 
-    let address = address.clone();
-    
     if state.destroy {
         gs.remove_contract(&address);
     } else {
-    
+
         let mut state_init = info_ex.state_init.clone();
         if let Some(c) = state.code {
             state_init.set_code(c);
         }
 
+        let contract_info = gs.get_contract_mut(&address).unwrap();
         contract_info.set_balance(state.balance);
         contract_info.set_state_init(state_init);
-        gs.set_contract(address, contract_info);
     }
 
     Ok(msgs)
@@ -7,7 +7,8 @@
     Copyright 2019-2021 (c) TON LABS
 */
 
-use std::sync::{Arc, Mutex};
+use std::cell::RefCell;
+use std::sync::Arc;
 
 use serde::{
     Serialize,
@@ -41,7 +42,7 @@ use crate::global_state::{
 };
 
 use crate::debug_info::{
-    load_debug_info, ContractDebugInfo, TraceStepInfo,
+    ContractDebugInfo, ProfileRun, TraceBuffer, TraceMode,
     get_function_name,
 };
 
@@ -52,12 +53,33 @@ use crate::messages::{
 
 ////////////////////////////////////////////////////////////////////////////////////////////
 
+/// State updated by the trace callback on every VM step without locking.
+struct StepState<T>(RefCell<T>);
+
+// The engine calls the trace callback synchronously from `execute()` on the thread
+// running it, and the state is taken only after `execute()` returns, so the cell
+// is never accessed concurrently.
+unsafe impl<T> Send for StepState<T> {}
+unsafe impl<T> Sync for StepState<T> {}
+
+impl<T: Default> StepState<T> {
+    fn new(value: T) -> Arc<StepState<T>> {
+        Arc::new(StepState(RefCell::new(value)))
+    }
+    fn take(&self) -> T {
+        self.0.take()
+    }
+}
+
 #[derive(Clone, Debug)]
 pub struct ExecutionResult {
     pub info:       ExecutionResultInfo,
     pub info_ex:    ExecutionResultEx,
     pub info_msg:   Option<String>,
-    pub trace:      Option<Vec<TraceStepInfo>>,
+    pub trace:      Option<TraceBuffer>,
+    pub profile:    Option<ProfileRun>,
+    /// Wall time spent in TVM, microseconds
+    pub tvm_time:   u64,
 }
 
 // TODO: unify these structures. Or give better names
@@ -82,8 +104,10 @@ pub fn call_contract_ex(
     contract_info:  &ContractInfo,
     msg_info:       &MessageInfo2,
     debug:          bool,
-    trace2:         bool,
+    trace_mode:     TraceMode,
     config_params:  Option<Cell>,
+    debug_info:     Option<Arc<ContractDebugInfo>>,
+    profiling:      bool,
     now:            u64,
     lt:             u64,
 ) -> ExecutionResult {
@@ -99,8 +123,7 @@ pub fn call_contract_ex(
 
     let addr                = contract_info.address();
     let state_init          = contract_info.state_init();
-    let contract_balance    = contract_info.balance();
-    let debug_info_filename = contract_info.debug_info_filename();
+    let contract_balance    = contract_info.balance() + msg_value.unwrap_or(0);
 
     //  0   - internal msg
     // -1   - external msg
@@ -158,21 +181,31 @@ pub fn call_contract_ex(
 
     let mut engine = Engine::new().setup(code, Some(registers), Some(stack), Some(gas));
 
-    let debug_info = if debug || trace2 {
-        load_debug_info(&state_init, debug_info_filename, debug)
+    let trace = StepState::new(TraceBuffer::new(trace_mode));
+    let profile = if profiling {
+        Some(StepState::new(ProfileRun::new(contract_info.short_name())))
     } else {
         None
     };
 
-    let trace = Arc::new(Mutex::new(vec![]));
-    let trace1 = trace.clone();
-
-    engine.set_trace_callback(move |engine, info| {
-        trace_callback(engine, info, debug, trace2, true, &debug_info, &mut trace.clone().lock().unwrap());
-    });
+    if debug || trace_mode.is_on() || profiling {
+        let trace = trace.clone();
+        let profile = profile.clone();
+        engine.set_trace_callback(move |engine, info| {
+            trace_callback(engine, info, debug, trace_mode, true, &debug_info, &trace, &profile);
+        });
+    } else {
+        // Nothing is recorded, only `tvm.log()` output is printed
+        engine.set_trace_callback(|_, info| {
+            if info.info_type == EngineTraceInfoType::Dump {
+                println!("logstr: {}", info.cmd_str);
+            }
+        });
+    }
 
     let mut error_msg = None;
 
+    let started = std::time::Instant::now();
     let exit_code = match engine.execute() {
         Err(exc) => match tvm_exception(exc) {
             Ok(exc) => {
@@ -186,8 +219,10 @@ pub fn call_contract_ex(
         }
         Ok(code) => code as i32
     };
+    let tvm_time = started.elapsed().as_micros() as u64;
 
-    let trace: Vec<TraceStepInfo> = trace1.lock().unwrap().clone();
+    let trace = trace.take();
+    let profile = profile.map(|p| p.take());
 
     let gas_usage = engine.get_gas().get_gas_used();
 
@@ -250,6 +285,8 @@ pub fn call_contract_ex(
         info_ex:  info_ex,
         info_msg: info_msg,
         trace:    Some(trace),
+        profile:  profile,
+        tvm_time: tvm_time,
     }
 }
 
@@ -292,17 +329,21 @@ fn trace_callback(
     _engine: &Engine,
     info: &EngineTraceInfo,
     trace: bool,
-    trace2: bool,
+    trace_mode: TraceMode,
     extended: bool,
-    debug_info: &Option<ContractDebugInfo>,
-    result: &mut Vec<TraceStepInfo>,
+    debug_info: &Option<Arc<ContractDebugInfo>>,
+    result: &StepState<TraceBuffer>,
+    profile: &Option<Arc<StepState<ProfileRun>>>,
 ) {
 
     let fname = get_function_name(&debug_info, &info.cmd_code);
 
-    if trace2 {
-        let info2 = TraceStepInfo::from(&info, fname.clone());
-        result.push(info2);
+    if trace_mode.is_on() {
+        result.0.borrow_mut().push(info, fname);
+    }
+
+    if let Some(profile) = profile {
+        profile.0.borrow_mut().push(fname, info.gas_cmd);
     }
 
     if trace {
@@ -320,8 +361,7 @@ fn trace_callback(
         );
 
         if debug_info.is_some() {
-            let fname = fname.unwrap_or("n/a".to_string());
-            println!("function: {}", fname);
+            println!("function: {}", fname.map(|s| s.as_str()).unwrap_or("n/a"));
         }
 
         println!("\n--- Stack trace ------------------------");
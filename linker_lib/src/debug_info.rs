@@ -8,10 +8,11 @@
 */
 
 use std::io::Write;
-use std::collections::HashMap;
+use std::sync::Arc;
+use std::collections::{HashMap, VecDeque};
 use ton_types::dictionary::HashmapE;
 use serde::{Deserialize, Serialize};
-use ton_block::{Serializable, StateInit};
+use ton_block::{Serializable};
 
 use ton_types::{
     UInt256, Cell, SliceData,
@@ -21,6 +22,10 @@ use ton_vm::executor::{
     EngineTraceInfo,
 };
 
+use ton_vm::stack::{
+    StackItem,
+};
+
 
 
 pub struct ContractDebugInfo {
@@ -50,34 +55,175 @@ pub struct TraceStepInfo {
 }
 
 
-impl DebugInfo {
-    pub fn _new() -> Self {
-        DebugInfo { internals: vec![], publics: vec![], privates: vec![] }
+/// Defines which VM steps are recorded for `get_last_trace()`
+#[derive(Clone, Copy, PartialEq, Debug)]
+pub enum TraceMode {
+    Off,
+    /// Only the last N steps are kept
+    Ring(usize),
+    /// A step is recorded only when execution moves to another function
+    Functions,
+    Full,
+}
+
+impl Default for TraceMode {
+    fn default() -> Self {
+        TraceMode::Off
     }
 }
 
-impl ContractDebugInfo {
-    pub fn find_function(&self, cmd_code: &SliceData) -> Option<&String> {
-        self.hash2function.get(&cmd_code.cell().repr_hash())
+impl TraceMode {
+    pub fn is_on(&self) -> bool {
+        match self {
+            TraceMode::Off      => false,
+            TraceMode::Ring(n)  => *n > 0,
+            _                   => true,
+        }
     }
 }
 
-impl TraceStepInfo {
-    #[allow(dead_code)]
-    pub fn from(info: &EngineTraceInfo, fname: Option<String>) -> TraceStepInfo {
-        let stack = info.stack.iter().map(
-            |x| format!("{}", x)
-        ).collect();
+/// Compact trace step. Stack items are shared with the VM and are
+/// stringified only when the trace is requested.
+#[derive(Clone, Debug)]
+pub struct TraceStep {
+    id: u32,
+    cmd: String,
+    gas: i64,
+    func: Option<String>,
+    stack: Vec<StackItem>,
+}
+
+impl TraceStep {
+    fn to_info(&self) -> TraceStepInfo {
         TraceStepInfo {
+            id: self.id,
+            cmd: self.cmd.clone(),
+            gas: self.gas,
+            func: self.func.clone(),
+            stack: self.stack.iter().map(|x| format!("{}", x)).collect(),
+        }
+    }
+}
+
+#[derive(Clone, Debug, Default)]
+pub struct TraceBuffer {
+    mode: TraceMode,
+    steps: VecDeque<TraceStep>,
+}
+
+impl TraceBuffer {
+    pub fn new(mode: TraceMode) -> TraceBuffer {
+        TraceBuffer { mode: mode, steps: VecDeque::new() }
+    }
+
+    pub fn push(&mut self, info: &EngineTraceInfo, fname: Option<&String>) {
+        let with_stack = match self.mode {
+            TraceMode::Off => return,
+            TraceMode::Functions => {
+                if let Some(last) = self.steps.back() {
+                    if last.func.as_ref() == fname {
+                        return;
+                    }
+                }
+                false
+            },
+            TraceMode::Ring(depth) => {
+                if depth == 0 {
+                    return;
+                }
+                if self.steps.len() >= depth {
+                    // Reuse buffers of the evicted step to avoid allocations per instruction
+                    let mut step = self.steps.pop_front().unwrap();
+                    step.id = info.step;
+                    step.cmd.clear();
+                    step.cmd.push_str(&info.cmd_str);
+                    step.gas = info.gas_cmd;
+                    if step.func.as_ref() != fname {
+                        step.func = fname.cloned();
+                    }
+                    step.stack.clear();
+                    step.stack.extend(info.stack.iter().cloned());
+                    self.steps.push_back(step);
+                    return;
+                }
+                true
+            },
+            TraceMode::Full => true,
+        };
+        self.steps.push_back(TraceStep {
             id: info.step,
             cmd: info.cmd_str.clone(),
             gas: info.gas_cmd,
-            func: fname,
-            stack: stack,
+            func: fname.cloned(),
+            stack: if with_stack { info.stack.iter().cloned().collect() } else { vec![] },
+        });
+    }
+
+    pub fn to_infos(&self) -> Vec<TraceStepInfo> {
+        self.steps.iter().map(|step| step.to_info()).collect()
+    }
+}
+
+/// Instruction count and gas accumulated for a collapsed call stack
+/// of the form `contract;func1;func2`
+pub type ProfileData = HashMap<String, (u64, i64)>;
+
+/// Per-run profiler. The call stack is inferred from function transitions:
+/// returning to a function that is already on the stack pops everything above it.
+#[derive(Clone, Debug, Default)]
+pub struct ProfileRun {
+    contract: String,
+    stack: Vec<String>,
+    key: String,
+    samples: ProfileData,
+}
+
+impl ProfileRun {
+    pub fn new(contract: String) -> ProfileRun {
+        ProfileRun { key: contract.clone(), contract: contract, ..Default::default() }
+    }
+
+    pub fn push(&mut self, fname: Option<&String>, gas: i64) {
+        let fname = fname.map(|s| s.as_str()).unwrap_or("n/a");
+        if self.stack.last().map(|s| s.as_str()) != Some(fname) {
+            if let Some(pos) = self.stack.iter().rposition(|f| f == fname) {
+                self.stack.truncate(pos + 1);
+            } else {
+                self.stack.push(fname.to_string());
+            }
+            self.key = std::iter::once(&self.contract)
+                .chain(self.stack.iter())
+                .cloned().collect::<Vec<_>>().join(";");
+        }
+        if let Some(entry) = self.samples.get_mut(&self.key) {
+            entry.0 += 1;
+            entry.1 += gas;
+        } else {
+            self.samples.insert(self.key.clone(), (1, gas));
+        }
+    }
+
+    pub fn merge_into(self, profile: &mut ProfileData) {
+        for (key, (count, gas)) in self.samples {
+            let entry = profile.entry(key).or_insert((0, 0));
+            entry.0 += count;
+            entry.1 += gas;
         }
     }
 }
 
+impl DebugInfo {
+    pub fn _new() -> Self {
+        DebugInfo { internals: vec![], publics: vec![], privates: vec![] }
+    }
+}
+
+impl ContractDebugInfo {
+    pub fn find_function(&self, cmd_code: &SliceData) -> Option<&String> {
+        self.hash2function.get(&cmd_code.cell().repr_hash())
+    }
+}
+
 pub fn _save_debug_info(
     info: DebugInfo,
     filename: String
@@ -87,8 +233,12 @@ pub fn _save_debug_info(
     write!(f, "{}", s).unwrap();
 }
 
+pub fn debug_info_filename(contract_name: &str) -> String {
+    format!("{}{}", contract_name.trim_end_matches("tvc"), "debug.json")
+}
+
 pub fn load_debug_info(
-    state_init: &StateInit,
+    code: &Cell,
     filename: String,
     verbose: bool,
 ) -> Option<ContractDebugInfo> {
@@ -105,7 +255,7 @@ pub fn load_debug_info(
     }
     let debug_info_json : DebugInfo = serde_json::from_str(&debug_info_str.unwrap()).unwrap();
 
-    let root_cell = state_init.code.as_ref().unwrap();
+    let root_cell = code;
     let dict1 = HashmapE::with_hashmap(32, Some(root_cell.reference(0).unwrap()));
     let dict2 = HashmapE::with_hashmap(32, Some(root_cell.reference(1).unwrap().reference(0).unwrap()));
 
@@ -178,14 +328,12 @@ fn set_function_hashes(
     }
 }
 
-pub fn get_function_name(
-    debug_info: &Option<ContractDebugInfo>,
+pub fn get_function_name<'a>(
+    debug_info: &'a Option<Arc<ContractDebugInfo>>,
     cmd_code: &SliceData,
-) -> Option<String> {
+) -> Option<&'a String> {
     if let Some(debug_info) = debug_info {
-        debug_info
-            .find_function(&cmd_code)
-            .map(|fname| fname.clone())
+        debug_info.find_function(&cmd_code)
     } else {
         None
     }
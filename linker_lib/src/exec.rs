@@ -7,6 +7,8 @@
     Copyright 2019-2021 (c) TON LABS
 */
 
+use std::sync::Arc;
+
 use ed25519_dalek::{
     Keypair,
 };
@@ -23,14 +25,14 @@ use ton_types::{
 };
 
 use crate::util::{
-    decode_address, load_from_file, get_msg_value,
-    convert_address,
+    load_from_file, get_msg_value,
+    convert_address, AccountRef, KeyRef,
 };
 
 use crate::global_state::{
     GlobalState,
     ContractInfo,
-    make_config_params,
+    KEY_STORE,
 };
 
 use crate::actions::{
@@ -54,7 +56,7 @@ use crate::abi::{
 };
 
 use crate::debug_info::{
-    TraceStepInfo,
+    TraceBuffer, TraceMode, ContractDebugInfo, debug_info_filename,
 };
 
 #[derive(Default)]
@@ -64,7 +66,7 @@ pub struct ExecutionResult2 {
     out_actions: Vec<String>,
     gas: i64,
     info: Option<String>,
-    pub trace: Option<Vec<TraceStepInfo>>,
+    pub trace: Option<TraceBuffer>,
 }
 
 impl ExecutionResult2 {
@@ -101,10 +103,10 @@ pub fn deploy_contract_impl(
     contract_name: Option<String>,
     state_init: StateInit,
     address: Option<MsgAddressInt>,
-    abi_info: AbiInfo,
+    abi_info: Arc<AbiInfo>,
     wc: i8,
     mut balance: u64
-) -> Result<String, String> {
+) -> Result<(String, u64), String> {
 
     let address0 = generate_contract_address(&state_init, wc);
     let address = address.unwrap_or(address0);
@@ -114,9 +116,8 @@ pub fn deploy_contract_impl(
         println!("deploy_contract_impl: {:?} {}", contract_name, address);
     }
 
-    if let Some(balance2) = gs.dummy_balances.get(&address) {
-        balance = *balance2;
-        gs.dummy_balances.remove(&address);
+    if let Some(balance2) = gs.take_dummy_balance(&address) {
+        balance = balance2;
     }
 
     let contract_info = ContractInfo::create(address.clone(), contract_name, state_init, abi_info, balance);
@@ -126,26 +127,28 @@ pub fn deploy_contract_impl(
     }
 
     let addr_str = format!("{}", address);
-    gs.set_contract(address, contract_info);
+    gs.set_contract(address.clone(), contract_info);
+    let handle = gs.account_handle(&address).unwrap();
 
-    Ok(addr_str)
+    Ok((addr_str, handle))
 }
 
 pub fn apply_constructor(
     state_init: StateInit,
     abi_file: &str,
-    abi_info: &AbiInfo,
+    abi_info: &Arc<AbiInfo>,
     ctor_params : &str,
-    private_key: Option<String>,
+    private_key: Option<KeyRef>,
     trace: bool,
-    trace2: bool,
+    trace_mode: TraceMode,
     time_header: Option<String>,
+    debug_info: Option<Arc<ContractDebugInfo>>,
     now: u64,
     lt: u64,
     error_msg: &mut Option<String>,
 ) -> Result<StateInit, String> {
 
-    let keypair = decode_private_key(&private_key);
+    let keypair = decode_private_key(&private_key)?;
 
     let body = build_abi_body(
         abi_info,
@@ -153,7 +156,7 @@ pub fn apply_constructor(
         ctor_params,
         time_header,
         false,  // is_internal
-        keypair.as_ref(),
+        keypair.as_deref(),
     )?;
 
     let addr = MsgAddressInt::default();
@@ -173,8 +176,10 @@ pub fn apply_constructor(
     let result = call_contract_ex(
         &contract_info,
         &msg_info,
-        trace, trace2,
+        trace, trace_mode,
         None,
+        debug_info,
+        false,
         now,
         lt,
     );
@@ -195,8 +200,7 @@ fn increase_dummy_balance(
     addr: MsgAddressInt,
     value: u64
 ) {
-    let prev = *gs.dummy_balances.get(&addr).unwrap_or(&0);
-    gs.dummy_balances.insert(addr, prev + value);
+    gs.increase_dummy_balance(addr, value);
 }
 
 
@@ -205,10 +209,10 @@ fn bounce_msg(
     msg: &MsgInfo,
 ) -> ExecutionResult2 {
 
-    let contract = gs.get_contract(&msg.src());
+    let abi_info = gs.get_contract(&msg.src()).map(|c| c.abi_info().clone());
     let mut msgs = vec![];
-    if msg.bounce() && contract.is_some() {
-        msgs.push(create_bounced_msg2(&gs, &msg, &contract.unwrap().abi_info()));
+    if msg.bounce() && abi_info.is_some() {
+        msgs.push(create_bounced_msg2(&gs, &msg, &abi_info.unwrap()));
     } else {
         increase_dummy_balance(gs, msg.dst(), msg.value());
     }
@@ -225,10 +229,9 @@ fn dispatch_message_on_error(
 
     let dst = msg.dst();
 
-    let mut contract = gs.get_contract(&dst).unwrap();
-    let abi_info = contract.abi_info().clone();     // TODO!!: Arc?
+    let contract = gs.get_contract_mut(&dst).unwrap();
     contract.change_balance(-1, msg.value());
-    gs.set_contract(dst, contract);
+    let abi_info = contract.abi_info().clone();
 
     if msg.bounce() {
         let msg = create_bounced_msg2(&gs, &msg, &abi_info);
@@ -253,7 +256,7 @@ pub fn dispatch_message_impl(
             return bounce_msg(gs, msg_info);
         }
         let wc = address.workchain_id() as i8;
-        deploy_contract_impl(gs, None, state_init.clone(), None, AbiInfo::default(), wc, 0).unwrap();
+        deploy_contract_impl(gs, None, state_init.clone(), None, Arc::new(AbiInfo::default()), wc, 0).unwrap();
     }
 
     if !gs.address_exists(&address) {
@@ -290,33 +293,47 @@ pub fn exec_contract_and_process_actions(
     gs.lt = gs.lt + 1;
 
     let address = msg_info.dst();
-    let mut contract_info = gs.get_contract(&address).unwrap();
-
-    if let Some(msg_value) = msg_info.value() {
-        contract_info.change_balance(1, msg_value);
-    }
+    let config_params = gs.config_params_cell();
+    let debug_info = gs.get_contract_debug_info(&address);
 
-    let mut result = call_contract_ex(
-        &contract_info,
+    let result = call_contract_ex(
+        gs.get_contract(&address).unwrap(),
         &msg_info,
-        gs.trace, gs.trace_on,
-        make_config_params(&gs),
+        gs.trace, gs.trace_mode,
+        config_params,
+        debug_info,
+        gs.profiling,
         gs.get_now(),
         gs.lt,
     );
 
+    process_execution_result(gs, msg_info, result, method)
+}
+
+fn process_execution_result(
+    gs: &mut GlobalState,
+    msg_info: &MessageInfo2,
+    mut result: ExecutionResult,
+    method: Option<String>,
+) -> ExecutionResult2 {
+
     gs.last_error_msg = result.info.error_msg.clone();
+    gs.last_tvm_time = result.tvm_time;
 
     result.info.inbound_msg_id = msg_info.id();
     gs.register_run_result(result.info.clone());
 
+    if let Some(profile) = result.profile.take() {
+        profile.merge_into(&mut gs.profile);
+    }
+
     if result.info_msg == Some("no_accept".to_string()) {
         return ExecutionResult2::with_actions(result, vec![])
     }
 
     let msgs = process_actions(
         gs,
-        contract_info,
+        &msg_info.dst(),
         &result,
         method,
         msg_info.value(),
@@ -356,75 +373,153 @@ pub fn encode_message_body_impl(
 
 pub fn call_contract_impl(
     gs: &mut GlobalState,
-    address_str: String,
+    account: AccountRef,
     method: String,
     is_getter: bool,
     is_debot: bool,
     params: String,
-    private_key: Option<String>,
+    private_key: Option<KeyRef>,
 ) -> Result<ExecutionResult2, String> {
-    // TODO: Too long function
-    let addr = decode_address(&address_str);
+    let (msg_info, history_info) = prepare_contract_call(
+        gs, &account, &method, is_getter, is_debot, &params, &private_key,
+    )?;
+    gs.messages.add(history_info);
+
+    let result = exec_contract_and_process_actions(
+        gs, &msg_info, Some(method),
+    );
+
+    Ok(result)
+}
 
-    let contract_info = gs.get_contract(&addr);
+/// Executes a batch of getters. Inbound messages are built first and registered
+/// only when all requests are valid, TVM runs are spread over `threads` worker
+/// threads and the results are then committed in the original order.
+pub fn call_getters_impl(
+    gs: &mut GlobalState,
+    requests: Vec<(AccountRef, String, String)>,
+    threads: usize,
+) -> Result<Vec<ExecutionResult2>, String> {
+
+    // Time headers advance the clock, it is restored if any request fails
+    let clock = gs.clock_state();
+    let mut prepared = vec![];
+    for (account, method, params) in requests {
+        match prepare_contract_call(gs, &account, &method, true, false, &params, &None) {
+            Ok((msg_info, history_info)) => prepared.push((msg_info, history_info, method)),
+            Err(err) => {
+                gs.restore_clock_state(clock);
+                return Err(err);
+            },
+        }
+    }
 
-    if contract_info.is_none() {
-        let err = format!("Account does not exist: {}", addr);
-        return Err(err);
+    let mut jobs = vec![];
+    for (msg_info, history_info, method) in prepared {
+        gs.messages.add(history_info);
+        gs.lt = gs.lt + 1;
+        jobs.push((msg_info, method, gs.lt));
     }
+    // Cloning is cheap: code, data and ABI are shared
+    let jobs: Vec<_> = jobs.into_iter().map(|(msg_info, method, lt)| {
+        let debug_info = gs.get_contract_debug_info(&msg_info.dst());
+        let contract_info = gs.get_contract(&msg_info.dst()).unwrap().clone();
+        (contract_info, msg_info, method, lt, debug_info)
+    }).collect();
+
+    let trace         = gs.trace;
+    let trace_mode    = gs.trace_mode;
+    let profiling     = gs.profiling;
+    let config_params = gs.config_params_cell();
+    let now           = gs.get_now();
+
+    let run_job = |job: &(ContractInfo, MessageInfo2, String, u64, Option<Arc<ContractDebugInfo>>),
+                   config_params: Option<Cell>| {
+        let (contract_info, msg_info, _, lt, debug_info) = job;
+        call_contract_ex(contract_info, msg_info, trace, trace_mode,
+                         config_params, debug_info.clone(), profiling, now, *lt)
+    };
+
+    let threads = threads.max(1).min(jobs.len().max(1));
+    let results: Vec<ExecutionResult> = if threads == 1 {
+        jobs.iter().map(|job| run_job(job, config_params.clone())).collect()
+    } else {
+        let chunk_size = (jobs.len() + threads - 1) / threads;
+        std::thread::scope(|s| {
+            let handles: Vec<_> = jobs.chunks(chunk_size).map(|chunk| {
+                let config_params = config_params.clone();
+                let run_job = &run_job;
+                s.spawn(move || {
+                    chunk.iter()
+                        .map(|job| run_job(job, config_params.clone()))
+                        .collect::<Vec<_>>()
+                })
+            }).collect();
+            handles.into_iter()
+                .flat_map(|h| h.join().unwrap())
+                .collect()
+        })
+    };
+
+    let results = jobs.into_iter().zip(results).map(
+        |((_, msg_info, method, _, _), result)|
+            process_execution_result(gs, &msg_info, result, Some(method))
+    ).collect();
+
+    Ok(results)
+}
 
-    let contract_info = contract_info.unwrap();
+fn prepare_contract_call(
+    gs: &mut GlobalState,
+    account: &AccountRef,
+    method: &String,
+    is_getter: bool,
+    is_debot: bool,
+    params: &String,
+    private_key: &Option<KeyRef>,
+) -> Result<(MessageInfo2, MsgInfo), String> {
+    // TODO: Too long function
+    let contract_info = gs.find_contract(account)?;
+    let addr = contract_info.address().clone();
+    let abi_info = contract_info.abi_info().clone();
 
     if gs.trace {
         println!("encode_function_call(\"{}\",\"{}\")", method, params);
         // println!("private_key {:?}", private_key);
     }
 
-    let keypair = decode_private_key(&private_key);
-
-    let abi_info = contract_info.abi_info();
+    let keypair = decode_private_key(private_key)?;
 
     let body = build_abi_body(
-        abi_info,
-        &method,
-        &params,
+        &abi_info,
+        method,
+        params,
         gs.make_time_header(),
         false, // internal
-        keypair.as_ref(),
-    );
-
-    if body.is_err() {
-        return Err(body.err().unwrap());
-    }
-
-    let body = body.unwrap();
+        keypair.as_deref(),
+    )?;
 
     let msg = create_inbound_msg(addr.clone(), &body, gs.get_now());
 
     // TODO: move to function
     let mut msg_abi = decode_message(&gs, &abi_info, Some(method.clone()), &msg, 0);
     msg_abi.fix_call(is_getter);
-    let msg_info = MsgInfo::create(msg.clone(), msg_abi);
-    gs.messages.add(msg_info);
+    let history_info = MsgInfo::create(msg.clone(), msg_abi);
 
     let msg_info = MessageInfo2::with_getter(msg, is_getter, is_debot);
 
-    let result = exec_contract_and_process_actions(
-        gs, &msg_info, Some(method.clone()),
-    );
-
-    Ok(result)
+    Ok((msg_info, history_info))
 }
 
 pub fn load_state_init(
     gs: &mut GlobalState,
     contract_file: &String,
     abi_file: &String,
-    abi_info: &AbiInfo,
+    abi_info: &Arc<AbiInfo>,
     ctor_params: &Option<String>,
     initial_data: &Option<String>,
     pubkey: &Option<String>,
-    private_key: &Option<String>,
+    private_key: &Option<KeyRef>,
     trace: bool,
 ) -> Result<StateInit, String> {
     let mut state_init = load_from_file(&contract_file);
@@ -450,12 +545,17 @@ pub fn load_state_init(
         if gs.trace {
             println!("apply_constructor: {}", ctor_params);
         }
+        let debug_info = match &state_init.code {
+            Some(code) if trace || gs.trace_mode.is_on() =>
+                gs.get_debug_info(code, debug_info_filename(contract_file)),
+            _ => None,
+        };
         let mut error_msg = None;
         let result = apply_constructor(
                         state_init, &abi_file, &abi_info, &ctor_params,
                         private_key.clone(),
-                        trace, gs.trace_on,
-                        time_header, gs.get_now(),
+                        trace, gs.trace_mode,
+                        time_header, debug_info, gs.get_now(),
                         gs.lt,
                         &mut error_msg,
                     );
@@ -468,11 +568,11 @@ pub fn load_state_init(
     Ok(state_init)
 }
 
-pub fn decode_private_key(private_key: &Option<String>) -> Option<Keypair> {
-    private_key.as_ref().map(|key| {
-        let secret = hex::decode(key).unwrap();
-        Keypair::from_bytes(&secret).expect("error: invalid key")
-    })
+pub fn decode_private_key(private_key: &Option<KeyRef>) -> Result<Option<Arc<Keypair>>, String> {
+    match private_key {
+        Some(key) => KEY_STORE.lock().unwrap().get(key).map(Some),
+        None => Ok(None),
+    }
 }
 
 pub fn decode_message(
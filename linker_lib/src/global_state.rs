@@ -10,19 +10,26 @@
 use std::sync::{Arc, Mutex};
 use std::collections::HashMap;
 
+use std::io::Cursor;
+
 use ton_block::{
-    MsgAddressInt, StateInit,
+    MsgAddressInt, StateInit, Serializable, Deserializable,
 };
 
 use ton_types::{
     BuilderData, Cell, HashmapE, IBitstring,
-    HashmapType,
+    HashmapType, UInt256, BagOfCells,
+    cells_serialization::{deserialize_cells_tree},
 };
 
+use serde::{Deserialize, Serialize};
+
 use crate::util::{
-    get_now,
+    get_now, get_now_ms, decode_address, AccountRef, KeyRef,
 };
 
+use ed25519_dalek::Keypair;
+
 use crate::call_contract::{
     ExecutionResultInfo,
 };
@@ -36,38 +43,153 @@ use crate::messages::{
 };
 
 use crate::debug_info::{
-    TraceStepInfo,
+    TraceBuffer, TraceMode, ContractDebugInfo, ProfileData,
+    load_debug_info, debug_info_filename,
 };
 
 ////////////////////////////////////////////////////////////////////////////////////////////
 
 #[derive(Default)]
 pub struct GlobalState {
-    contracts: HashMap<MsgAddressInt, ContractInfo>,
-    pub dummy_balances: HashMap<MsgAddressInt, u64>,
+    /// Accounts indexed by handle. Removed accounts keep their slots,
+    /// so a handle always refers to the same address
+    contracts: Vec<Option<ContractInfo>>,
+    addresses: Vec<MsgAddressInt>,
+    account_handles: HashMap<MsgAddressInt, u32>,
+    /// Distinguishes handles issued before `reset_all()`
+    pub epoch: u32,
+    dummy_balances: HashMap<MsgAddressInt, u64>,
     pub all_abis: AllAbis,
     pub messages: MessageStorage,
     pub trace: bool,
-    pub trace_on: bool,
-    pub last_trace: Option<Vec<TraceStepInfo>>,
+    pub trace_mode: TraceMode,
+    pub last_trace: Option<TraceBuffer>,
     pub last_error_msg: Option<String>,
-    pub config_params: HashMap<u32, Cell>,
+    config_params: HashMap<u32, Cell>,
+    config_params_cell: Option<Option<Cell>>,
     now: Option<u64>,
     now2: u64,
+    pub clock_mode: ClockMode,
+    last_time_ms: u64,
     pub lt: u64,
     pub runs: Vec<ExecutionResultInfo>,
+    debug_infos: HashMap<(UInt256, String), Option<Arc<ContractDebugInfo>>>,
+    pub profiling: bool,
+    pub profile: ProfileData,
+    pub last_tvm_time: u64,
+    /// Nested checkpoints, the innermost one is the last
+    checkpoints: Vec<Checkpoint>,
 }
 
 lazy_static! {
     pub static ref GLOBAL_STATE: Mutex<GlobalState> = Mutex::new(GlobalState::default());
+    pub static ref KEY_STORE: Mutex<KeyStore> = Mutex::new(KeyStore::default());
+}
+
+/// Parsed keypairs. Keys are parsed once and are not dropped by `reset_all()`,
+/// so key handles stay valid for the whole process.
+#[derive(Default)]
+pub struct KeyStore {
+    keys: Vec<Arc<Keypair>>,
+    handles: HashMap<String, u32>,
+}
+
+impl KeyStore {
+    pub fn register(&mut self, secret: &String) -> Result<u32, String> {
+        if let Some(handle) = self.handles.get(secret) {
+            return Ok(*handle);
+        }
+        let bytes = hex::decode(secret)
+            .map_err(|e| format!("cannot decode private key: {}", e))?;
+        let keypair = Keypair::from_bytes(&bytes)
+            .map_err(|e| format!("invalid key: {}", e))?;
+        let handle = self.keys.len() as u32;
+        self.keys.push(Arc::new(keypair));
+        self.handles.insert(secret.clone(), handle);
+        Ok(handle)
+    }
+    pub fn get(&mut self, key: &KeyRef) -> Result<Arc<Keypair>, String> {
+        let handle = match key {
+            KeyRef::Handle(handle) => *handle,
+            KeyRef::Hex(secret) => self.register(secret)?,
+        };
+        self.keys.get(handle as usize).cloned()
+            .ok_or(format!("Invalid key handle {}", handle))
+    }
+}
+
+/// Undo log used to roll the state back to a checkpoint. Accounts and dummy
+/// balances are saved on their first modification, messages and runs are
+/// only appended, so storing their counts is enough.
+#[derive(Default)]
+struct Checkpoint {
+    contracts: HashMap<u32, Option<ContractInfo>>,
+    dummy_balances: HashMap<MsgAddressInt, Option<u64>>,
+    messages: usize,
+    runs: usize,
+    lt: u64,
+    now: Option<u64>,
+    now2: u64,
+    last_error_msg: Option<String>,
+    last_trace: Option<TraceBuffer>,
+    last_tvm_time: u64,
+    profile: ProfileData,
+}
+
+/// State file: magic, length of JSON metadata (u32 LE), metadata and a single
+/// BOC with StateInits of all accounts followed by config params as roots.
+/// Code and data shared between accounts are stored only once.
+const STATE_MAGIC: &[u8; 8] = b"TS4STAT1";
+
+#[derive(Serialize, Deserialize)]
+struct AccountMeta {
+    address: String,
+    name: String,
+    abi: String,
+    balance: u64,
+}
+
+#[derive(Serialize, Deserialize, Default)]
+struct StateMeta {
+    accounts: Vec<AccountMeta>,
+    abis: HashMap<String, String>,
+    /// Emulator-wide part is only present in full state files
+    full: bool,
+    dummy_balances: Vec<(String, u64)>,
+    config_params: Vec<u32>,
+    now: Option<u64>,
+    now2: u64,
+    lt: u64,
+    /// Last time header in real-clock mode, accounts may keep it for replay protection
+    #[serde(default)]
+    last_time_ms: u64,
+    extra: Option<String>,
+}
+
+/// Defines how time headers of external messages are generated in real-clock mode
+#[derive(Clone, Copy, PartialEq)]
+pub enum ClockMode {
+    /// Strictly monotonic milliseconds based on the wall clock. No sleeping
+    Monotonic,
+    /// Let ABI use the wall clock and sleep 1ms to avoid replay protection errors
+    Sleep,
+}
+
+impl Default for ClockMode {
+    fn default() -> Self {
+        ClockMode::Monotonic
+    }
 }
 
+/// Account stored in the global state. Code, data and ABI are shared
+/// (cells and `Arc<AbiInfo>`), so cloning is cheap and does not depend on
+/// code size or ABI length. Prefer in-place updates via `get_contract_mut()`.
 #[derive(Clone)]
 pub struct ContractInfo {
-    name: String,
+    name: Arc<String>,
     addr: MsgAddressInt,
     state_init: StateInit,
-    abi_info: AbiInfo,
+    abi_info: Arc<AbiInfo>,
     balance: u64,
 }
 
@@ -77,12 +199,12 @@ impl ContractInfo {
         address: MsgAddressInt,
         contract_name: Option<String>,
         state_init: StateInit,
-        abi_info: AbiInfo,
+        abi_info: Arc<AbiInfo>,
         balance: u64,
     ) -> ContractInfo {
         ContractInfo {
             addr: address,
-            name: contract_name.unwrap_or("n/a".to_string()),
+            name: Arc::new(contract_name.unwrap_or("n/a".to_string())),
             state_init: state_init,
             abi_info: abi_info,
             balance: balance,
@@ -92,15 +214,25 @@ impl ContractInfo {
         &self.addr
     }
 
-    pub fn abi_info(&self) -> &AbiInfo {
+    pub fn abi_info(&self) -> &Arc<AbiInfo> {
         &self.abi_info
     }
 
-    pub fn set_abi(&mut self, abi: AbiInfo) {
+    pub fn set_abi(&mut self, abi: Arc<AbiInfo>) {
         self.abi_info = abi;
     }
+    pub fn name(&self) -> &String {
+        &self.name
+    }
     pub fn debug_info_filename(&self) -> String {
-        format!("{}{}", self.name.trim_end_matches("tvc"), "debug.json")
+        debug_info_filename(&self.name)
+    }
+    /// Contract file name without directory and extension (used by the profiler)
+    pub fn short_name(&self) -> String {
+        std::path::Path::new(self.name.as_str())
+            .file_stem()
+            .map(|s| s.to_string_lossy().to_string())
+            .unwrap_or(self.name.to_string())
     }
     pub fn balance(&self) -> u64 {
         self.balance
@@ -125,22 +257,215 @@ impl ContractInfo {
 
 impl GlobalState {
 
+    /// Drops all accounts, messages and settings. Keeps state that does not
+    /// depend on the emulated chain.
+    pub fn reset(&mut self) {
+        // Profile is accumulated across the whole scenario
+        let profiling = self.profiling;
+        let profile = std::mem::take(&mut self.profile);
+        // ABI handles stay valid after reset
+        let mut all_abis = std::mem::take(&mut self.all_abis);
+        all_abis.clear_registered();
+        // Debug info is keyed by code hash and file name, so it survives as well
+        let debug_infos = std::mem::take(&mut self.debug_infos);
+        // Clock mode is chosen by `init()`, time headers stay increasing
+        let clock_mode = self.clock_mode;
+        let last_time_ms = self.last_time_ms;
+        let epoch = self.epoch.wrapping_add(1);
+        *self = GlobalState::default();
+        self.epoch = epoch;
+        self.profiling = profiling;
+        self.profile = profile;
+        self.all_abis = all_abis;
+        self.debug_infos = debug_infos;
+        self.clock_mode = clock_mode;
+        self.last_time_ms = last_time_ms;
+    }
+
     pub fn set_contract(&mut self, address: MsgAddressInt, info: ContractInfo) {
         assert!(address == *info.address());
         self.all_abis.register_abi(info.abi_info().clone());
-        self.contracts.insert(address, info);
-
+        let slot = match self.account_handles.get(&address) {
+            Some(slot) => *slot,
+            None => {
+                let slot = self.contracts.len() as u32;
+                self.contracts.push(None);
+                self.addresses.push(address.clone());
+                self.account_handles.insert(address, slot);
+                slot
+            },
+        };
+        self.save_contract(slot);
+        self.contracts[slot as usize] = Some(info);
+    }
+    pub fn set_contract_abi(&mut self, address: &MsgAddressInt, abi_info: Arc<AbiInfo>) -> bool {
+        self.all_abis.register_abi(abi_info.clone());
+        match self.get_contract_mut(address) {
+            Some(info) => {
+                info.set_abi(abi_info);
+                true
+            },
+            None => false,
+        }
     }
     pub fn remove_contract(&mut self, address: &MsgAddressInt) {
-        self.contracts.remove(address);
+        if let Some(slot) = self.account_handles.get(address).cloned() {
+            self.save_contract(slot);
+            self.contracts[slot as usize] = None;
+        }
     }
     pub fn address_exists(&self, address: &MsgAddressInt) -> bool {
-        self.contracts.contains_key(&address)
+        self.get_contract(address).is_some()
+    }
+    pub fn get_contract(&self, address: &MsgAddressInt) -> Option<&ContractInfo> {
+        let slot = self.account_handles.get(address)?;
+        self.contracts[*slot as usize].as_ref()
+    }
+    pub fn get_contract_mut(&mut self, address: &MsgAddressInt) -> Option<&mut ContractInfo> {
+        let slot = self.account_handles.get(address).cloned()?;
+        self.save_contract(slot);
+        self.contracts[slot as usize].as_mut()
+    }
 
+    /// Returns a handle of an existing account. Handles are only valid until `reset_all()`.
+    pub fn account_handle(&self, address: &MsgAddressInt) -> Option<u64> {
+        let slot = self.account_handles.get(address)?;
+        self.contracts[*slot as usize].as_ref()?;
+        Some(((self.epoch as u64) << 32) | *slot as u64)
     }
-    pub fn get_contract(&self, address: &MsgAddressInt) -> Option<ContractInfo> {
-        let state = self.contracts.get(&address);
-        state.map(|info| (*info).clone())
+    fn handle_slot(&self, handle: u64) -> Result<usize, String> {
+        let slot = (handle & 0xFFFF_FFFF) as usize;
+        if (handle >> 32) as u32 != self.epoch || slot >= self.contracts.len() {
+            return Err(format!("Invalid or stale account handle {:x}", handle));
+        }
+        Ok(slot)
+    }
+    /// Returns an account by handle. The account may have been removed since the handle was issued.
+    pub fn get_contract_by_handle(&self, handle: u64) -> Result<Option<&ContractInfo>, String> {
+        let slot = self.handle_slot(handle)?;
+        Ok(self.contracts[slot].as_ref())
+    }
+    pub fn find_contract(&self, account: &AccountRef) -> Result<&ContractInfo, String> {
+        let contract = match account {
+            AccountRef::Handle(handle) => self.get_contract_by_handle(*handle)?,
+            AccountRef::Address(address) => self.get_contract(&decode_address(address)),
+        };
+        contract.ok_or_else(|| format!("Account does not exist: {}", self.resolve_account(account).unwrap()))
+    }
+    /// Resolves an account passed from Python either by handle or by address
+    pub fn resolve_account(&self, account: &AccountRef) -> Result<MsgAddressInt, String> {
+        match account {
+            AccountRef::Handle(handle) => Ok(self.addresses[self.handle_slot(*handle)?].clone()),
+            AccountRef::Address(address) => Ok(decode_address(address)),
+        }
+    }
+
+    pub fn dummy_balance(&self, address: &MsgAddressInt) -> Option<u64> {
+        self.dummy_balances.get(address).cloned()
+    }
+    pub fn take_dummy_balance(&mut self, address: &MsgAddressInt) -> Option<u64> {
+        self.save_dummy_balance(address);
+        self.dummy_balances.remove(address)
+    }
+    pub fn increase_dummy_balance(&mut self, address: MsgAddressInt, value: u64) {
+        self.save_dummy_balance(&address);
+        let prev = self.dummy_balances.get(&address).cloned().unwrap_or(0);
+        self.dummy_balances.insert(address, prev + value);
+    }
+
+    /// Starts recording changes, so that they can be discarded by `rollback()`.
+    /// Checkpoints can be nested, `rollback()` and `commit_checkpoint()` end the innermost one.
+    pub fn begin_checkpoint(&mut self) {
+        self.checkpoints.push(Checkpoint {
+            messages:       self.messages.len(),
+            runs:           self.runs.len(),
+            lt:             self.lt,
+            now:            self.now,
+            now2:           self.now2,
+            last_error_msg: self.last_error_msg.clone(),
+            last_trace:     self.last_trace.clone(),
+            last_tvm_time:  self.last_tvm_time,
+            profile:        self.profile.clone(),
+            ..Default::default()
+        });
+    }
+    /// Restores accounts, message history, runs, logical time, time, last trace
+    /// and profile saved by `begin_checkpoint()`.
+    pub fn rollback(&mut self) -> Result<(), String> {
+        let checkpoint = self.checkpoints.pop().ok_or("No active checkpoint".to_string())?;
+        for (slot, info) in checkpoint.contracts {
+            self.contracts[slot as usize] = info;
+        }
+        for (address, balance) in checkpoint.dummy_balances {
+            match balance {
+                Some(balance) => self.dummy_balances.insert(address, balance),
+                None => self.dummy_balances.remove(&address),
+            };
+        }
+        self.messages.truncate(checkpoint.messages);
+        self.runs.truncate(checkpoint.runs);
+        self.lt = checkpoint.lt;
+        self.now = checkpoint.now;
+        self.now2 = checkpoint.now2;
+        self.last_error_msg = checkpoint.last_error_msg;
+        self.last_trace = checkpoint.last_trace;
+        self.last_tvm_time = checkpoint.last_tvm_time;
+        self.profile = checkpoint.profile;
+        Ok(())
+    }
+    /// Keeps all changes made since `begin_checkpoint()`. Inside another checkpoint
+    /// the changes can still be discarded by rolling the outer one back.
+    pub fn commit_checkpoint(&mut self) -> Result<(), String> {
+        let checkpoint = self.checkpoints.pop().ok_or("No active checkpoint".to_string())?;
+        if let Some(parent) = self.checkpoints.last_mut() {
+            // Values saved by the parent are older, the rest were not changed
+            // between the two checkpoints
+            for (slot, info) in checkpoint.contracts {
+                parent.contracts.entry(slot).or_insert(info);
+            }
+            for (address, balance) in checkpoint.dummy_balances {
+                parent.dummy_balances.entry(address).or_insert(balance);
+            }
+        }
+        Ok(())
+    }
+
+    fn save_contract(&mut self, slot: u32) {
+        if let Some(checkpoint) = self.checkpoints.last_mut() {
+            if !checkpoint.contracts.contains_key(&slot) {
+                checkpoint.contracts.insert(slot, self.contracts[slot as usize].clone());
+            }
+        }
+    }
+    fn save_dummy_balance(&mut self, address: &MsgAddressInt) {
+        if let Some(checkpoint) = self.checkpoints.last_mut() {
+            if !checkpoint.dummy_balances.contains_key(address) {
+                checkpoint.dummy_balances.insert(address.clone(), self.dummy_balances.get(address).cloned());
+            }
+        }
+    }
+
+    /// Returns debug info for a given code. Loaded info (or its absence) is cached
+    /// by code hash and file name, so a code change naturally invalidates it.
+    pub fn get_debug_info(&mut self, code: &Cell, filename: String) -> Option<Arc<ContractDebugInfo>> {
+        let key = (code.repr_hash(), filename);
+        if let Some(debug_info) = self.debug_infos.get(&key) {
+            return debug_info.clone();
+        }
+        let debug_info = load_debug_info(code, key.1.clone(), self.trace).map(Arc::new);
+        self.debug_infos.insert(key, debug_info.clone());
+        debug_info
+    }
+
+    /// Returns debug info of a deployed contract when it is needed for tracing.
+    pub fn get_contract_debug_info(&mut self, address: &MsgAddressInt) -> Option<Arc<ContractDebugInfo>> {
+        if !self.trace && !self.trace_mode.is_on() && !self.profiling {
+            return None;
+        }
+        let contract = self.get_contract(address)?;
+        let code = contract.state_init().code.clone()?;
+        let filename = contract.debug_info_filename();
+        self.get_debug_info(&code, filename)
     }
 
     pub fn add_messages(&mut self, msgs: Vec<MsgInfo>) -> Vec<String> {
@@ -155,14 +480,32 @@ impl GlobalState {
     }
 
     pub fn make_time_header(&mut self) -> Option<String> {
-        if self.now.is_none() {
-            // Add sleep to avoid Replay Protection Error issue
-            std::thread::sleep(std::time::Duration::from_millis(1));
-        }
-        self.now.map(|v| {
+        if let Some(now) = self.now {
             self.now2 += 1;
-            format!("{{\"time\": {}}}", v*1000 + self.now2)
-        })
+            return Some(format!("{{\"time\": {}}}", now*1000 + self.now2));
+        }
+        match self.clock_mode {
+            ClockMode::Monotonic => {
+                // Strictly increasing values avoid Replay Protection Error issue
+                let time = get_now_ms().max(self.last_time_ms + 1);
+                self.last_time_ms = time;
+                Some(format!("{{\"time\": {}}}", time))
+            },
+            ClockMode::Sleep => {
+                // Add sleep to avoid Replay Protection Error issue
+                std::thread::sleep(std::time::Duration::from_millis(1));
+                None
+            },
+        }
+    }
+
+    /// Returns the state advanced by `make_time_header()`
+    pub fn clock_state(&self) -> (u64, u64) {
+        (self.now2, self.last_time_ms)
+    }
+    pub fn restore_clock_state(&mut self, (now2, last_time_ms): (u64, u64)) {
+        self.now2 = now2;
+        self.last_time_ms = last_time_ms;
     }
 
     pub fn set_now(&mut self, now: u64) {
@@ -170,6 +513,137 @@ impl GlobalState {
         self.now2 = 0;
     }
 
+    pub fn set_config_param(&mut self, idx: u32, cell: Option<Cell>) {
+        match cell {
+            Some(cell) => self.config_params.insert(idx, cell),
+            None => self.config_params.remove(&idx),
+        };
+        self.config_params_cell = None;
+    }
+
+    /// Returns config params dictionary. It is built once and reused
+    /// until the next `set_config_param()` call.
+    pub fn config_params_cell(&mut self) -> Option<Cell> {
+        if self.config_params_cell.is_none() {
+            self.config_params_cell = Some(make_config_params(&self.config_params));
+        }
+        self.config_params_cell.clone().unwrap()
+    }
+
+    /// Serializes accounts (all of them when `addresses` is None). Full state files
+    /// also contain dummy balances, config params, time, lt and `extra` data.
+    pub fn export_state(
+        &self,
+        addresses: Option<Vec<MsgAddressInt>>,
+        full: bool,
+        extra: Option<String>,
+    ) -> Result<Vec<u8>, String> {
+        let contracts: Vec<&ContractInfo> = match addresses {
+            Some(addresses) => addresses.iter().map(|addr|
+                self.get_contract(addr).ok_or(format!("Account does not exist: {}", addr))
+            ).collect::<Result<_, _>>()?,
+            None => self.contracts.iter().filter_map(|c| c.as_ref()).collect(),
+        };
+
+        let mut meta = StateMeta { full, extra, last_time_ms: self.last_time_ms, ..Default::default() };
+        let mut roots = vec![];
+        for contract in contracts {
+            let abi_info = contract.abi_info();
+            if !meta.abis.contains_key(abi_info.filename()) {
+                meta.abis.insert(abi_info.filename().clone(), abi_info.text().clone());
+            }
+            meta.accounts.push(AccountMeta {
+                address: format!("{}", contract.address()),
+                name:    contract.name().to_string(),
+                abi:     abi_info.filename().clone(),
+                balance: contract.balance(),
+            });
+            roots.push(contract.state_init().serialize()
+                .map_err(|e| format!("Serialization failed: {}", e))?);
+        }
+        if full {
+            meta.dummy_balances = self.dummy_balances.iter()
+                .map(|(addr, balance)| (format!("{}", addr), *balance)).collect();
+            for (idx, cell) in self.config_params.iter() {
+                meta.config_params.push(*idx);
+                roots.push(cell.clone());
+            }
+            meta.now  = self.now;
+            meta.now2 = self.now2;
+            meta.lt   = self.lt;
+        }
+
+        let meta = serde_json::to_vec(&meta).unwrap();
+        let mut buffer = Vec::with_capacity(STATE_MAGIC.len() + 4 + meta.len());
+        buffer.extend_from_slice(STATE_MAGIC);
+        buffer.extend_from_slice(&(meta.len() as u32).to_le_bytes());
+        buffer.extend_from_slice(&meta);
+        if !roots.is_empty() {
+            BagOfCells::with_roots(roots.iter().collect()).write_to(&mut buffer, false)
+                .map_err(|e| format!("BOC failed: {}", e))?;
+        }
+        Ok(buffer)
+    }
+
+    /// Loads accounts from a state file, replacing existing accounts with the same
+    /// addresses. Emulator-wide part of a full state file is applied unless `accounts_only`.
+    /// Returns addresses of loaded accounts and `extra` data.
+    pub fn import_state(&mut self, data: &[u8], accounts_only: bool) -> Result<(Vec<String>, Option<String>), String> {
+        let header = STATE_MAGIC.len() + 4;
+        if data.len() < header || &data[..STATE_MAGIC.len()] != STATE_MAGIC {
+            return Err("Not a TS4 state file".to_string());
+        }
+        let mut len = [0u8; 4];
+        len.copy_from_slice(&data[STATE_MAGIC.len()..header]);
+        let len = u32::from_le_bytes(len) as usize;
+        if data.len() < header + len {
+            return Err("Truncated TS4 state file".to_string());
+        }
+        let meta: StateMeta = serde_json::from_slice(&data[header..header + len])
+            .map_err(|e| format!("Cannot parse state metadata: {}", e))?;
+        let roots = if data.len() > header + len {
+            deserialize_cells_tree(&mut Cursor::new(&data[header + len..]))
+                .map_err(|e| format!("Cannot deserialize cells: {}", e))?
+        } else {
+            vec![]
+        };
+        if roots.len() != meta.accounts.len() + meta.config_params.len() {
+            return Err("Corrupted TS4 state file".to_string());
+        }
+
+        let mut roots = roots.into_iter();
+        let mut loaded = Vec::with_capacity(meta.accounts.len());
+        for account in meta.accounts {
+            let cell = roots.next().unwrap();
+            let state_init = StateInit::construct_from(&mut cell.into())
+                .map_err(|e| format!("Cannot load account {}: {}", account.address, e))?;
+            let text = meta.abis.get(&account.abi).cloned().unwrap_or_default();
+            let abi_info = self.all_abis.from_text(account.abi, text);
+            let address = decode_address(&account.address);
+            let info = ContractInfo::create(
+                address.clone(), Some(account.name), state_init, abi_info, account.balance,
+            );
+            self.set_contract(address, info);
+            loaded.push(account.address);
+        }
+        if meta.full && !accounts_only {
+            for (idx, cell) in meta.config_params.into_iter().zip(roots) {
+                self.set_config_param(idx, Some(cell));
+            }
+            for (addr, balance) in meta.dummy_balances {
+                let addr = decode_address(&addr);
+                self.save_dummy_balance(&addr);
+                self.dummy_balances.insert(addr, balance);
+            }
+            self.now  = meta.now;
+            self.now2 = meta.now2;
+            self.lt   = self.lt.max(meta.lt);
+        }
+        // Time headers must stay increasing for the loaded accounts
+        self.last_time_ms = self.last_time_ms.max(meta.last_time_ms);
+        Ok((loaded, meta.extra))
+    }
+
     pub fn register_run_result(&mut self, mut result: ExecutionResultInfo) {
         result.run_id = Some(self.runs.len() as u32);
         self.runs.push(result);
@@ -182,13 +656,13 @@ impl GlobalState {
 
 }
 
-pub fn make_config_params(gs: &GlobalState) -> Option<Cell> {
+fn make_config_params(config_params: &HashMap<u32, Cell>) -> Option<Cell> {
     let mut map = HashmapE::with_hashmap(32, None);
-    for (key, value) in gs.config_params.clone() {
+    for (key, value) in config_params.iter() {
         let mut b = BuilderData::new();
-        b.append_u32(key).unwrap();
+        b.append_u32(*key).unwrap();
         let key = b.into();
-        map.setref(key, &value).unwrap();
+        map.setref(key, value).unwrap();
     }
     map.data().map(|v| v.clone())
 }
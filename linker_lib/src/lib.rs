@@ -40,13 +40,24 @@ mod exec;
 mod call_contract;
 mod messages;
 
+use abi::{
+    decode_contract_data, AbiRef,
+};
+
+use debug_info::{
+    debug_info_filename, TraceMode,
+};
+
 use global_state::{
-    GlobalState, GLOBAL_STATE,
+    ClockMode, GLOBAL_STATE, KEY_STORE,
 };
 
-use ton_block::Serializable;
+use ton_block::{
+    GetRepresentationHash, Serializable,
+};
 use util::{
-    decode_address, load_from_file,
+    decode_address, load_from_file, CellData, AccountRef, KeyRef,
+    cell_stats as cell_stats_impl, cell_tree_to_json,
 };
 
 use messages::{
@@ -59,6 +70,7 @@ use exec::{
     dispatch_message_impl,
     deploy_contract_impl,
     call_contract_impl,
+    call_getters_impl,
     load_state_init,
     encode_message_body_impl,
 };
@@ -76,13 +88,11 @@ use rand::SeedableRng;
 use pyo3::prelude::*;
 use pyo3::wrap_pyfunction;
 use pyo3::exceptions::PyRuntimeError;
-
-use std::io::Cursor;
+use pyo3::types::PyBytes;
 
 use ton_types::{
     SliceData,
     serialize_toc,
-    cells_serialization::{deserialize_cells_tree},
     BagOfCells
 };
 
@@ -96,24 +106,90 @@ fn set_trace(trace: bool) -> PyResult<()> {
 
 #[pyfunction]
 fn trace_on() -> PyResult<()> {
-    GLOBAL_STATE.lock().unwrap().trace_on = true;
+    GLOBAL_STATE.lock().unwrap().trace_mode = TraceMode::Full;
+    Ok(())
+}
+
+#[pyfunction]
+fn set_trace_mode(mode: String, depth: Option<usize>) -> PyResult<()> {
+    let mode = match mode.as_str() {
+        "off"       => TraceMode::Off,
+        "ring"      => TraceMode::Ring(depth.unwrap_or(1000)),
+        "functions" => TraceMode::Functions,
+        "full"      => TraceMode::Full,
+        _ => return Err(PyRuntimeError::new_err(format!("Unknown trace mode '{}'", mode))),
+    };
+    GLOBAL_STATE.lock().unwrap().trace_mode = mode;
+    Ok(())
+}
+
+#[pyfunction]
+fn begin_checkpoint() -> PyResult<()> {
+    GLOBAL_STATE.lock().unwrap().begin_checkpoint();
+    Ok(())
+}
+
+#[pyfunction]
+fn rollback() -> PyResult<()> {
+    GLOBAL_STATE.lock().unwrap().rollback()
+        .map_err(|e| PyRuntimeError::new_err(e))
+}
+
+#[pyfunction]
+fn commit_checkpoint() -> PyResult<()> {
+    GLOBAL_STATE.lock().unwrap().commit_checkpoint()
+        .map_err(|e| PyRuntimeError::new_err(e))
+}
+
+#[pyfunction]
+fn get_last_tvm_time() -> PyResult<u64> {
+    Ok(GLOBAL_STATE.lock().unwrap().last_tvm_time)
+}
+
+#[pyfunction]
+fn set_profiling(enabled: bool) -> PyResult<()> {
+    GLOBAL_STATE.lock().unwrap().profiling = enabled;
     Ok(())
 }
 
+#[pyfunction]
+fn get_profile() -> PyResult<String> {
+    let gs = GLOBAL_STATE.lock().unwrap();
+    Ok(serde_json::to_string(&gs.profile).unwrap())
+}
+
+#[pyfunction]
+fn reset_profile() -> PyResult<()> {
+    GLOBAL_STATE.lock().unwrap().profile.clear();
+    Ok(())
+}
+
+#[pyfunction]
+fn preload_debug_info(contract_file: String) -> PyResult<bool> {
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    let state_init = load_from_file(&contract_file);
+    let loaded = match state_init.code {
+        Some(code) => gs.get_debug_info(&code, debug_info_filename(&contract_file)).is_some(),
+        None => false,
+    };
+    Ok(loaded)
+}
+
 #[pyfunction]
 fn gen_addr(
     contract_file: String,
-    abi_file: String,
+    abi: AbiRef,
     initial_data: Option<String>,
     pubkey: Option<String>,
-    private_key: Option<String>,
+    private_key: Option<KeyRef>,
     wc: i8
 ) -> PyResult<String> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
     let trace = gs.trace;
 
-    let abi_info = gs.all_abis.from_file(&abi_file)
+    let abi_info = gs.all_abis.get(&abi)
                      .map_err(|e| PyRuntimeError::new_err(e))?;
+    let abi_file = abi_info.filename().clone();
 
     let state_init = load_state_init(
         &mut gs,
@@ -136,20 +212,21 @@ fn gen_addr(
 #[pyfunction]
 fn deploy_contract(
     contract_file: String,
-    abi_file: String,
+    abi: AbiRef,
     ctor_params: Option<String>,
     initial_data: Option<String>,
     pubkey: Option<String>,
-    private_key: Option<String>,
+    private_key: Option<KeyRef>,
     wc: i8,
     override_address: Option<String>,
     balance: u64,
-) -> PyResult<String> {
+) -> PyResult<(String, u64)> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
     let trace = gs.trace;
 
-    let abi_info = gs.all_abis.from_file(&abi_file)
+    let abi_info = gs.all_abis.get(&abi)
                      .map_err(|e| PyRuntimeError::new_err(e))?;
+    let abi_file = abi_info.filename().clone();
 
     let state_init = load_state_init(
         &mut gs,
@@ -196,6 +273,16 @@ fn fetch_contract_state(address: String) -> PyResult<(Option<String>, Option<Str
     Ok((Some(code), Some(data)))
 }
 
+#[pyfunction]
+fn read_data(account: AccountRef) -> PyResult<String> {
+    let gs = GLOBAL_STATE.lock().unwrap();
+    let contract = gs.find_contract(&account)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    let data = contract.state_init().data.clone().unwrap_or_default();
+    decode_contract_data(contract.abi_info(), data)
+        .map_err(|e| PyRuntimeError::new_err(e))
+}
+
 #[pyfunction]
 fn save_tvc(address: String, filename: String) -> PyResult<()> {
     let address = decode_address(&address);
@@ -216,64 +303,103 @@ fn save_tvc(address: String, filename: String) -> PyResult<()> {
 }
 
 #[pyfunction]
-fn get_balance(address: String) -> PyResult<Option<u64>> {
-    let address = decode_address(&address);
+fn get_balance(account: AccountRef) -> PyResult<Option<u64>> {
     let gs = GLOBAL_STATE.lock().unwrap();
+    if let AccountRef::Handle(handle) = account {
+        let contract = gs.get_contract_by_handle(handle)
+            .map_err(|e| PyRuntimeError::new_err(e))?;
+        if let Some(contract) = contract {
+            return Ok(Some(contract.balance()));
+        }
+    }
+    let address = gs.resolve_account(&account)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
     let contract = gs.get_contract(&address);
-    let balance = if gs.dummy_balances.contains_key(&address) {
+    let balance = if let Some(balance) = gs.dummy_balance(&address) {
         assert!(contract.is_none());
-        Some(gs.dummy_balances[&address])
+        Some(balance)
     } else {
         contract.map(|c| c.balance())
     };
     Ok(balance)
 }
 
+#[pyfunction]
+/// Returns everything a getter result depends on: hash of the account
+/// StateInit, balance, current time and hash of config params.
+fn get_state_hash(account: AccountRef) -> PyResult<Option<(String, u64, u64, String)>> {
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    let config_hash = gs.config_params_cell()
+        .map(|cell| cell.repr_hash().to_hex_string())
+        .unwrap_or_default();
+    let now = gs.get_now();
+    let contract = match account {
+        AccountRef::Handle(handle) => gs.get_contract_by_handle(handle)
+            .map_err(|e| PyRuntimeError::new_err(e))?,
+        AccountRef::Address(address) => gs.get_contract(&decode_address(&address)),
+    };
+    let state = contract.map(|contract| {
+        let hash = contract.state_init().hash().unwrap();
+        (hash.to_hex_string(), contract.balance(), now, config_hash)
+    });
+    Ok(state)
+}
+
 #[pyfunction]
 fn set_balance(address: String, balance: u64) -> PyResult<()> {
     let address = decode_address(&address);
     let mut gs = GLOBAL_STATE.lock().unwrap();
-    let mut contract_info = gs.get_contract(&address).unwrap();
-    contract_info.set_balance(balance);
-    gs.set_contract(address, contract_info);
+    gs.get_contract_mut(&address).unwrap().set_balance(balance);
     Ok(())
 }
 
 #[pyfunction]
 fn dispatch_message(msg_id: u32) -> PyResult<(i32, Vec<String>, i64, Option<String>)> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
-    let result = dispatch_message_impl(&mut gs, msg_id);
-    gs.last_trace = result.trace.clone();
+    let mut result = dispatch_message_impl(&mut gs, msg_id);
+    gs.last_trace = result.trace.take();
     Ok(result.unpack())
 }
 
 #[pyfunction]
-fn set_contract_abi(address_str: Option<String>, abi_file: String) -> PyResult<()> {
+fn load_abi(abi_file: String) -> PyResult<u32> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
-    let abi_info = gs.all_abis.from_file(&abi_file)
+    gs.all_abis.load(&abi_file)
+        .map_err(|e| PyRuntimeError::new_err(e))
+}
+
+#[pyfunction]
+fn set_contract_abi(address_str: Option<String>, abi: AbiRef) -> PyResult<Option<u64>> {
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    let abi_info = gs.all_abis.get(&abi)
                      .map_err(|e| PyRuntimeError::new_err(e))?;
     if let Some(address_str) = address_str {
         let addr = decode_address(&address_str);
-        let contract_info = gs.get_contract(&addr);
-        if contract_info.is_none() {
+        if !gs.set_contract_abi(&addr, abi_info) {
             let err = format!("Unable to set ABI for non-existent address {}", addr);
             return Err(PyRuntimeError::new_err(err));
         }
-        let mut contract_info = contract_info.unwrap();
-        contract_info.set_abi(abi_info);
-        gs.set_contract(addr, contract_info);
+        return Ok(gs.account_handle(&addr));
     }
-    Ok(())
+    Ok(None)
+}
+
+#[pyfunction]
+fn get_account_handle(address: String) -> PyResult<Option<u64>> {
+    let address = decode_address(&address);
+    let gs = GLOBAL_STATE.lock().unwrap();
+    Ok(gs.account_handle(&address))
 }
 
 #[pyfunction]
 fn call_ticktock(
-    address_str: String,
+    account: AccountRef,
     is_tock: bool,
 ) -> PyResult<(i32, Vec<String>, i64, Option<String>)> {
-    let address = decode_address(&address_str);
-
     let mut gs = GLOBAL_STATE.lock().unwrap();
+    let address = gs.resolve_account(&account)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+
     // TODO: move to call_ticktock_impl()
     let msg_info = MessageInfo2::with_ticktock(is_tock, address.clone());
 
@@ -301,24 +427,35 @@ fn log_str(
 
 #[pyfunction]
 fn call_contract(
-    address_str: String,
+    account: AccountRef,
     method: String,
     is_getter: bool,
     is_debot: bool,
     params: String,
-    private_key: Option<String>,
+    private_key: Option<KeyRef>,
 ) -> PyResult<(i32, Vec<String>, i64, Option<String>)> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
-    let result =
-        call_contract_impl(&mut gs, address_str, method,
+    let mut result =
+        call_contract_impl(&mut gs, account, method,
                            is_getter, is_debot, params, private_key);
-    if let Ok(ref result) = result {
-        gs.last_trace = result.trace.clone();
+    if let Ok(ref mut result) = result {
+        gs.last_trace = result.trace.take();
     }
     let result = result.map_err(|e| PyRuntimeError::new_err(e))?;
     Ok(result.unpack())
 }
 
+#[pyfunction]
+fn call_getters(
+    requests: Vec<(AccountRef, String, String)>,
+    threads: usize,
+) -> PyResult<Vec<(i32, Vec<String>, i64, Option<String>)>> {
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    let results = call_getters_impl(&mut gs, requests, threads)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    Ok(results.into_iter().map(|result| result.unpack()).collect())
+}
+
 // ---------------------------------------------------------------------------------------
 
 #[pyfunction]
@@ -328,6 +465,17 @@ fn set_now(now: u64) -> PyResult<()> {
     Ok(())
 }
 
+#[pyfunction]
+fn set_clock_mode(mode: String) -> PyResult<()> {
+    let mode = match mode.as_str() {
+        "monotonic" => ClockMode::Monotonic,
+        "sleep"     => ClockMode::Sleep,
+        _ => return Err(PyRuntimeError::new_err(format!("Unknown clock mode '{}'", mode))),
+    };
+    GLOBAL_STATE.lock().unwrap().clock_mode = mode;
+    Ok(())
+}
+
 #[pyfunction]
 fn get_now() -> PyResult<u64> {
     let gs = GLOBAL_STATE.lock().unwrap();
@@ -337,34 +485,72 @@ fn get_now() -> PyResult<u64> {
 }
 
 #[pyfunction]
-fn set_config_param(idx: u32, cell: String) -> PyResult<()> {
+fn set_config_param(idx: u32, cell: CellData) -> PyResult<()> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
 
-    let cell = base64::decode(&cell).unwrap();
-    let mut csor = Cursor::new(cell);
-    let cell = deserialize_cells_tree(&mut csor).unwrap().remove(0);
+    let cell = cell.to_cell().map_err(|e| PyRuntimeError::new_err(e))?;
 
     let is_empty = cell.bit_length() == 0;
     if gs.trace {
         println!("set_config_param {} is_empty={}", idx, is_empty);
     }
-    if is_empty {
-        gs.config_params.remove(&idx);
-    } else {
-        gs.config_params.insert(idx, cell);
-    }
+    gs.set_config_param(idx, if is_empty { None } else { Some(cell) });
 
     Ok(())
 }
 
 #[pyfunction]
 fn reset_all() -> PyResult<()> {
-    use std::ops::DerefMut;
     let mut gs = GLOBAL_STATE.lock().unwrap();
-    *gs.deref_mut() = GlobalState::default();
+    gs.reset();
     Ok(())
 }
 
+#[pyfunction]
+fn save_state(filename: String, extra: Option<String>) -> PyResult<()> {
+    let gs = GLOBAL_STATE.lock().unwrap();
+    let buffer = gs.export_state(None, true, extra)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    std::fs::write(&filename, buffer)
+        .map_err(|e| PyRuntimeError::new_err(format!("Write to file failed: {}", e)))
+}
+
+#[pyfunction]
+fn export_accounts(accounts: Vec<AccountRef>, filename: String) -> PyResult<usize> {
+    let gs = GLOBAL_STATE.lock().unwrap();
+    let addresses = accounts.iter()
+        .map(|account| gs.resolve_account(account))
+        .collect::<Result<Vec<_>, _>>()
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    let count = addresses.len();
+    let buffer = gs.export_state(Some(addresses), false, None)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    std::fs::write(&filename, buffer)
+        .map_err(|e| PyRuntimeError::new_err(format!("Write to file failed: {}", e)))?;
+    Ok(count)
+}
+
+#[pyfunction]
+fn import_accounts(filename: String) -> PyResult<Vec<String>> {
+    let data = std::fs::read(&filename)
+        .map_err(|e| PyRuntimeError::new_err(format!("Cannot load {}: {}", filename, e)))?;
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    let (loaded, _) = gs.import_state(&data, true)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    Ok(loaded)
+}
+
+#[pyfunction]
+fn load_state(filename: String) -> PyResult<Option<String>> {
+    let data = std::fs::read(&filename)
+        .map_err(|e| PyRuntimeError::new_err(format!("Cannot load {}: {}", filename, e)))?;
+    let mut gs = GLOBAL_STATE.lock().unwrap();
+    gs.reset();
+    let (_, extra) = gs.import_state(&data, false)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    Ok(extra)
+}
+
 #[pyfunction]
 fn make_keypair(seed : Option<u64>) -> PyResult<(String, String)> {
     let keypair = match seed {
@@ -384,20 +570,29 @@ fn make_keypair(seed : Option<u64>) -> PyResult<(String, String)> {
 }
 
 #[pyfunction]
-fn sign_cell(cell: String, secret: String) -> PyResult<String> {
-    let cell = base64::decode(&cell).unwrap();
-    // TODO: util?
-    let mut csor = Cursor::new(cell);
-    let cell = deserialize_cells_tree(&mut csor).unwrap().remove(0);
-
-    let secret = hex::decode(secret).unwrap();
-    let keypair = Keypair::from_bytes(&secret).expect("error: invalid key");
+fn sign_cell(cell: CellData, secret: KeyRef) -> PyResult<String> {
+    let mut signatures = sign_cells(vec![cell], secret)?;
+    Ok(signatures.remove(0))
+}
 
-    let data = SliceData::from(cell).get_bytestring(0);
-    let signature = keypair.sign(&data).to_bytes();
-    let signature = hex::encode(signature.to_vec());
+#[pyfunction]
+fn sign_cells(cells: Vec<CellData>, secret: KeyRef) -> PyResult<Vec<String>> {
+    let keypair = KEY_STORE.lock().unwrap().get(&secret)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    let mut signatures = Vec::with_capacity(cells.len());
+    for cell in cells {
+        let cell = cell.to_cell().map_err(|e| PyRuntimeError::new_err(e))?;
+        let data = SliceData::from(cell).get_bytestring(0);
+        let signature = keypair.sign(&data).to_bytes();
+        signatures.push(hex::encode(signature.to_vec()));
+    }
+    Ok(signatures)
+}
 
-    Ok(signature)
+#[pyfunction]
+fn register_keypair(secret: String) -> PyResult<u32> {
+    KEY_STORE.lock().unwrap().register(&secret)
+        .map_err(|e| PyRuntimeError::new_err(e))
 }
 
 #[pyfunction]
@@ -418,7 +613,8 @@ fn get_all_messages() -> PyResult<String> {
 #[pyfunction]
 fn get_last_trace() -> PyResult<String> {
     let gs = GLOBAL_STATE.lock().unwrap();
-    let result = serde_json::to_string(&gs.last_trace).unwrap();
+    let trace = gs.last_trace.as_ref().map(|trace| trace.to_infos());
+    let result = serde_json::to_string(&trace).unwrap();
     Ok(result)
 }
 
@@ -429,31 +625,67 @@ fn get_last_error_msg() -> PyResult<Option<String>> {
 }
 
 #[pyfunction]
-fn load_code_cell(filename: String) -> PyResult<String> {
+fn cell_hash(cell: CellData) -> PyResult<String> {
+    let cell = cell.to_cell().map_err(|e| PyRuntimeError::new_err(e))?;
+    Ok(cell.repr_hash().to_hex_string())
+}
+
+#[pyfunction]
+fn cell_stats(cell: CellData) -> PyResult<(u16, u64, u64)> {
+    let cell = cell.to_cell().map_err(|e| PyRuntimeError::new_err(e))?;
+    Ok(cell_stats_impl(&cell))
+}
+
+#[pyfunction]
+fn cell_parse_tree(cell: CellData, max_cells: usize) -> PyResult<String> {
+    let cell = cell.to_cell().map_err(|e| PyRuntimeError::new_err(e))?;
+    let tree = cell_tree_to_json(&cell, max_cells)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    let result = serde_json::to_string(&tree).unwrap();
+    Ok(result)
+}
+
+#[pyfunction]
+fn load_code_cell(py: Python, filename: String) -> PyResult<PyObject> {
     let state_init = load_from_file(&filename);
     let code = state_init.code.unwrap();
     let bytes = serialize_toc(&code).unwrap();
-    Ok(base64::encode(&bytes))
+    Ok(PyBytes::new(py, &bytes).into())
 }
 
 #[pyfunction]
-fn load_data_cell(filename: String) -> PyResult<String> {
+fn load_data_cell(py: Python, filename: String) -> PyResult<PyObject> {
     // TODO: add tests for that
     let state_init = load_from_file(&filename);
     let data = state_init.data.unwrap();
     let bytes = serialize_toc(&data).unwrap();
-    Ok(base64::encode(&bytes))
+    Ok(PyBytes::new(py, &bytes).into())
 }
 
 #[pyfunction]
-fn encode_message_body(abi_file: String, method: String, params: String) -> PyResult<String> {
+fn encode_message_body(py: Python, abi: AbiRef, method: String, params: String) -> PyResult<PyObject> {
     let mut gs = GLOBAL_STATE.lock().unwrap();
     let abi_info = gs.all_abis
-        .from_file(&abi_file)
+        .get(&abi)
         .map_err(|e| PyRuntimeError::new_err(e))?;
     let cell = encode_message_body_impl(&abi_info, method, params);
     let result = serialize_toc(&cell.unwrap()).unwrap();
-    Ok(base64::encode(&result))
+    Ok(PyBytes::new(py, &result).into())
+}
+
+#[pyfunction]
+fn encode_message_bodies(py: Python, abi: AbiRef, method: String, params: Vec<String>) -> PyResult<Vec<PyObject>> {
+    let abi_info = GLOBAL_STATE.lock().unwrap()
+        .all_abis.get(&abi)
+        .map_err(|e| PyRuntimeError::new_err(e))?;
+    let mut result = Vec::with_capacity(params.len());
+    for (i, params) in params.into_iter().enumerate() {
+        let cell = encode_message_body_impl(&abi_info, method.clone(), params)
+            .map_err(|e| PyRuntimeError::new_err(format!("body #{}: {}", i, e)))?;
+        let bytes = serialize_toc(&cell).unwrap();
+        result.push(PyBytes::new(py, &bytes).into());
+    }
+    Ok(result)
 }
 /////////////////////////////////////////////////////////////////////////////////////
 /// A Python module implemented in Rust.
@@ -464,26 +696,47 @@ fn linker_lib(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(deploy_contract))?;
     m.add_wrapped(wrap_pyfunction!(gen_addr))?;
     m.add_wrapped(wrap_pyfunction!(call_contract))?;
+    m.add_wrapped(wrap_pyfunction!(call_getters))?;
     m.add_wrapped(wrap_pyfunction!(call_ticktock))?;
     m.add_wrapped(wrap_pyfunction!(log_str))?;
     m.add_wrapped(wrap_pyfunction!(get_balance))?;
     m.add_wrapped(wrap_pyfunction!(set_balance))?;
+    m.add_wrapped(wrap_pyfunction!(get_state_hash))?;
     m.add_wrapped(wrap_pyfunction!(fetch_contract_state))?;
+    m.add_wrapped(wrap_pyfunction!(read_data))?;
+    m.add_wrapped(wrap_pyfunction!(get_account_handle))?;
 
     m.add_wrapped(wrap_pyfunction!(dispatch_message))?;
 
     m.add_wrapped(wrap_pyfunction!(set_now))?;
     m.add_wrapped(wrap_pyfunction!(get_now))?;
+    m.add_wrapped(wrap_pyfunction!(set_clock_mode))?;
     m.add_wrapped(wrap_pyfunction!(set_trace))?;
     m.add_wrapped(wrap_pyfunction!(trace_on))?;
+    m.add_wrapped(wrap_pyfunction!(set_trace_mode))?;
+    m.add_wrapped(wrap_pyfunction!(preload_debug_info))?;
+    m.add_wrapped(wrap_pyfunction!(get_last_tvm_time))?;
+    m.add_wrapped(wrap_pyfunction!(begin_checkpoint))?;
+    m.add_wrapped(wrap_pyfunction!(rollback))?;
+    m.add_wrapped(wrap_pyfunction!(commit_checkpoint))?;
+    m.add_wrapped(wrap_pyfunction!(set_profiling))?;
+    m.add_wrapped(wrap_pyfunction!(get_profile))?;
+    m.add_wrapped(wrap_pyfunction!(reset_profile))?;
+    m.add_wrapped(wrap_pyfunction!(load_abi))?;
     m.add_wrapped(wrap_pyfunction!(set_contract_abi))?;
     m.add_wrapped(wrap_pyfunction!(set_config_param))?;
 
     m.add_wrapped(wrap_pyfunction!(make_keypair))?;
     m.add_wrapped(wrap_pyfunction!(sign_cell))?;
+    m.add_wrapped(wrap_pyfunction!(sign_cells))?;
+    m.add_wrapped(wrap_pyfunction!(register_keypair))?;
     m.add_wrapped(wrap_pyfunction!(load_code_cell))?;
     m.add_wrapped(wrap_pyfunction!(load_data_cell))?;
     m.add_wrapped(wrap_pyfunction!(encode_message_body))?;
+    m.add_wrapped(wrap_pyfunction!(encode_message_bodies))?;
+    m.add_wrapped(wrap_pyfunction!(cell_hash))?;
+    m.add_wrapped(wrap_pyfunction!(cell_stats))?;
+    m.add_wrapped(wrap_pyfunction!(cell_parse_tree))?;
 
     m.add_wrapped(wrap_pyfunction!(get_all_runs))?;
     m.add_wrapped(wrap_pyfunction!(get_all_messages))?;
@@ -491,6 +744,10 @@ fn linker_lib(_py: Python, m: &PyModule) -> PyResult<()> {
     m.add_wrapped(wrap_pyfunction!(get_last_error_msg))?;
 
     m.add_wrapped(wrap_pyfunction!(save_tvc))?;
+    m.add_wrapped(wrap_pyfunction!(save_state))?;
+    m.add_wrapped(wrap_pyfunction!(load_state))?;
+    m.add_wrapped(wrap_pyfunction!(export_accounts))?;
+    m.add_wrapped(wrap_pyfunction!(import_accounts))?;
 
     Ok(())
 }
@@ -453,6 +453,12 @@ impl MessageStorage {
     pub fn get(&self, id: u32) -> Arc<MsgInfo> {
         self.messages[id as usize].clone()
     }
+    pub fn len(&self) -> usize {
+        self.messages.len()
+    }
+    pub fn truncate(&mut self, len: usize) {
+        self.messages.truncate(len);
+    }
     pub fn to_json(&self) -> JsonValue {
         self.messages.iter().map(|msg| msg.json().clone()).collect()
     }
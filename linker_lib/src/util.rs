@@ -11,14 +11,19 @@ use num::{BigInt};
 use crate::num::ToPrimitive;
 
 use std::io::Cursor;
+use std::collections::{HashMap, HashSet};
 use std::time::SystemTime;
 use std::str::FromStr;
 
 use ton_types::{
-    UInt256, SliceData, AccountId,
+    UInt256, SliceData, AccountId, Cell,
     cells_serialization::{deserialize_cells_tree}
 };
 
+use pyo3::FromPyObject;
+
+use serde_json::{json, Value as JsonValue};
+
 use ton_block::{
     CommonMsgInfo, MsgAddressIntOrNone,
     CurrencyCollection, Deserializable, ExternalInboundMessageHeader, Grams,
@@ -104,6 +109,101 @@ pub fn get_now() -> u64 {
     SystemTime::now().duration_since(SystemTime::UNIX_EPOCH).unwrap().as_secs() as u64
 }
 
+pub fn get_now_ms() -> u64 {
+    SystemTime::now().duration_since(SystemTime::UNIX_EPOCH).unwrap().as_millis() as u64
+}
+
+/// Serialized cell (BOC) passed from Python. `bytes` are borrowed without
+/// copying; base64 strings are still accepted for compatibility.
+#[derive(FromPyObject)]
+pub enum CellData<'a> {
+    Bytes(&'a [u8]),
+    Base64(String),
+}
+
+/// Account passed from Python: a handle returned by the core or an address string.
+#[derive(FromPyObject)]
+pub enum AccountRef {
+    Handle(u64),
+    Address(String),
+}
+
+/// Private key passed from Python: a handle returned by `register_keypair()`
+/// or a hexadecimal secret.
+#[derive(FromPyObject, Clone)]
+pub enum KeyRef {
+    Handle(u32),
+    Hex(String),
+}
+
+impl CellData<'_> {
+    pub fn to_cell(&self) -> Result<Cell, String> {
+        let decoded;
+        let bytes = match self {
+            CellData::Bytes(bytes) => *bytes,
+            CellData::Base64(s) => {
+                decoded = base64::decode(s).map_err(|e| format!("Invalid base64: {}", e))?;
+                &decoded[..]
+            },
+        };
+        let mut csor = Cursor::new(bytes);
+        deserialize_cells_tree(&mut csor)
+            .map_err(|e| format!("Cannot deserialize cell: {}", e))?
+            .into_iter().next()
+            .ok_or("Empty cells tree".to_string())
+    }
+}
+
+/// Returns depth, number of unique cells and their total size in bits.
+pub fn cell_stats(root: &Cell) -> (u16, u64, u64) {
+    let mut visited = HashSet::new();
+    let mut stack = vec![root.clone()];
+    let mut bits = 0u64;
+    while let Some(cell) = stack.pop() {
+        if !visited.insert(cell.repr_hash()) {
+            continue;
+        }
+        bits += cell.bit_length() as u64;
+        for i in 0..cell.references_count() {
+            stack.push(cell.reference(i).unwrap());
+        }
+    }
+    (root.repr_depth(), visited.len() as u64, bits)
+}
+
+/// Returns unique cells of the tree, the root goes first. References are given
+/// as indices in the returned list, so cells shared in a DAG are emitted once.
+pub fn cell_tree_to_json(root: &Cell, max_cells: usize) -> Result<JsonValue, String> {
+    let mut indices = HashMap::new();
+    indices.insert(root.repr_hash(), 0usize);
+    let mut cells = vec![root.clone()];
+    let mut nodes = vec![];
+    // Cells are indexed in the order they are visited (BFS)
+    while nodes.len() < cells.len() {
+        let cell = cells[nodes.len()].clone();
+        let mut refs = vec![];
+        for i in 0..cell.references_count() {
+            let child = cell.reference(i).unwrap();
+            let next = cells.len();
+            let index = *indices.entry(child.repr_hash()).or_insert(next);
+            if index == next {
+                if next >= max_cells {
+                    return Err(format!("Cells tree has more than {} unique cells", max_cells));
+                }
+                cells.push(child);
+            }
+            refs.push(index);
+        }
+        nodes.push(json!({
+            "hash": cell.repr_hash().to_hex_string(),
+            "bits": cell.bit_length(),
+            "data": SliceData::from(cell).to_hex_string(),
+            "refs": refs,
+        }));
+    }
+    Ok(JsonValue::Array(nodes))
+}
+
 pub fn decode_address(address: &String) -> MsgAddressInt {
     MsgAddressInt::from_str(&address).unwrap()
 }
@@ -0,0 +1,21 @@
+import os
+
+import pytest
+
+import tonos_ts4.ts4 as ts4_
+from tonos_ts4 import globals as g
+
+
+CONTRACTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tutorials', 'contracts')
+
+@pytest.fixture
+def ts4():
+    """TS4 initialized with tutorial contracts. Tests are skipped when the core is not built."""
+    try:
+        g.core.load()
+    except Exception as err:
+        pytest.skip(str(err))
+    ts4_.reset_all()
+    ts4_.init(os.path.normpath(CONTRACTS_PATH))
+    yield ts4_
+    ts4_.reset_all()
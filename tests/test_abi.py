@@ -0,0 +1,42 @@
+import json
+import os
+import shutil
+
+from tonos_ts4 import globals as g
+
+
+def test_abi_handle_follows_file_content(ts4, tmp_path):
+    fn = str(tmp_path / 'tutorial01.abi.json')
+    shutil.copy(os.path.join(g.G_TESTS_PATH, 'tutorial01.abi.json'), fn)
+    handle = ts4.core.load_abi(fn)
+    assert ts4.eq(handle, ts4.core.load_abi(fn))
+
+    with open(fn) as fp:
+        abi = json.load(fp)
+    abi['functions'] = [f for f in abi['functions'] if f['name'] != 'm_bool']
+    with open(fn, 'w') as fp:
+        json.dump(abi, fp)
+    handle2 = ts4.core.load_abi(fn)
+    assert handle2 != handle
+    assert ts4.eq(handle2, ts4.core.load_abi(fn))
+    # The old handle keeps its ABI
+    ts4.core.encode_message_body(handle, 'm_bool', '{}')
+
+def test_abi_reloaded_after_reset(ts4, tmp_path):
+    for name in ['tutorial01.tvc', 'tutorial01.abi.json']:
+        shutil.copy(os.path.join(g.G_TESTS_PATH, name), str(tmp_path / name))
+    ts4.set_tests_path(str(tmp_path) + '/')
+    tut01 = ts4.BaseContract('tutorial01', {})
+    assert ts4.eq(True, tut01.call_getter('m_bool'))
+
+    # Rename getter as if the contract was rebuilt with a changed ABI
+    fn = str(tmp_path / 'tutorial01.abi.json')
+    with open(fn) as fp:
+        text = fp.read()
+    with open(fn, 'w') as fp:
+        fp.write(text.replace('"m_bool"', '"m_flag"'))
+    ts4.reset_all()
+    tut01 = ts4.BaseContract('tutorial01', {})
+    assert 'm_bool' not in [f['name'] for f in tut01.abi.json['functions']]
+    # The core uses the new ABI as well
+    ts4.encode_message_body(tut01.abi, 'm_flag', dict())
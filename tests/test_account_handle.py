@@ -0,0 +1,28 @@
+def test_handle_after_reset_and_redeploy(ts4):
+    tut02 = ts4.BaseContract('tutorial02', {})
+    tut02.call_method('set_number', dict(value = 7))
+    assert tut02.balance is not None
+
+    ts4.reset_all()
+    # The stale handle is not used for an account that no longer exists
+    assert tut02.balance is None
+
+    # Deploy with the same code and data gives the same address and a new handle
+    tut02b = ts4.BaseContract('tutorial02', {})
+    assert ts4.eq(tut02.address, tut02b.address)
+    tut02b.call_method('set_number', dict(value = 8))
+    assert ts4.eq(8, tut02.call_getter('m_number'))
+    assert ts4.eq(tut02b.balance, tut02.balance)
+
+def test_handle_after_load_state(ts4, tmp_path):
+    fn = str(tmp_path / 'handle.state')
+    tut02 = ts4.BaseContract('tutorial02', {})
+    tut02.call_method('set_number', dict(value = 7))
+    balance = tut02.balance
+    ts4.save_state(fn)
+
+    ts4.load_state(fn)
+    assert ts4.eq(balance, tut02.balance)
+    assert ts4.eq(7, tut02.call_getter('m_number'))
+    tut02.call_method('set_number', dict(value = 9))
+    assert ts4.eq(9, tut02.call_getter('m_number'))
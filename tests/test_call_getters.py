@@ -0,0 +1,38 @@
+import pytest
+
+
+GETTERS = ['m_number', 'm_address', 'm_bool', 'm_string', 'm_array', 'm_struct', 'get_tuple']
+
+def test_call_getters_matches_call_getter(ts4):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    expected = [tut01.call_getter(method) for method in GETTERS]
+    for threads in [1, 3]:
+        answers = ts4.call_getters([(tut01, method) for method in GETTERS], threads = threads)
+        assert ts4.eq(expected, answers)
+
+def test_call_getters_expect_ec(ts4):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    # Unsigned `setNumber` fails with 101 as the owner's key is not specified
+    tut06 = ts4.BaseContract('tutorial06', {}, keypair = ts4.make_keypair())
+    assert tut06.call_getter('setNumber', dict(value = 1), expect_ec = 101) is None
+    answers = ts4.call_getters([
+        (tut01, 'm_bool'),
+        (tut06, 'setNumber', dict(value = 1), 101),
+        (tut01, 'm_number', dict(), 0),
+    ])
+    assert ts4.eq([True, None, 3735928559], answers)
+    with pytest.raises(Exception):
+        ts4.call_getters([(tut01, 'm_bool', dict(), 101)])
+
+def test_call_getters_invalid_request(ts4):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    messages = len(ts4.get_all_messages(show_all = True))
+    requests = [
+        (tut01._account(), 'm_bool', '{}'),
+        ('0:' + '1' * 64, 'm_bool', '{}'),
+        (tut01._account(), 'm_number', '{}'),
+    ]
+    with pytest.raises(RuntimeError):
+        ts4.core.call_getters(requests, 1)
+    # Nothing is registered when any request is invalid
+    assert ts4.eq(messages, len(ts4.get_all_messages(show_all = True)))
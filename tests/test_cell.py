@@ -0,0 +1,57 @@
+import base64
+
+import pytest
+
+import tonos_ts4.ts4 as ts4
+
+
+EMPTY_CELL_BYTES = base64.b64decode(ts4.EMPTY_CELL)
+
+def test_cell_from_bytes():
+    cell = ts4.Cell(memoryview(EMPTY_CELL_BYTES))
+    assert cell.to_bytes() == EMPTY_CELL_BYTES
+    assert isinstance(cell.core_arg_(), bytes)
+    assert cell.raw_ == ts4.EMPTY_CELL
+    assert cell == ts4.Cell(ts4.EMPTY_CELL)
+
+def test_cell_raw_setter():
+    cell = ts4.Cell(EMPTY_CELL_BYTES)
+    cell.hash_ = 'stale'
+    cell.raw_ = ts4.EMPTY_CELL
+    assert cell.data_ is None
+    assert cell.hash_ is None
+    assert cell.to_bytes() == EMPTY_CELL_BYTES
+
+def test_malformed_cells_are_not_equal():
+    assert ts4.Cell(b'\x01\x02') != ts4.Cell(b'\x03\x04')
+    assert ts4.Cell(b'\x01\x02') == ts4.Cell(b'\x01\x02')
+
+def test_load_boc(tmp_path):
+    fn = tmp_path / 'empty.boc'
+    fn.write_bytes(EMPTY_CELL_BYTES)
+    cell = ts4.load_boc(str(fn))
+    assert cell.to_bytes() == EMPTY_CELL_BYTES
+
+def test_cell_stats_and_tree(ts4):
+    code = ts4.load_code_cell('tutorial01')
+    stats = code.stats()
+    tree = code.parse_tree()
+    # Every unique cell is listed once
+    assert ts4.eq(stats['cells'], len(tree))
+    assert ts4.eq(len(tree), len(set(node['hash'] for node in tree)))
+    assert ts4.eq(code.hash(), tree[0]['hash'])
+    assert ts4.eq(stats['bits'], sum(node['bits'] for node in tree))
+    for node in tree:
+        assert all(0 < i < len(tree) for i in node['refs'])
+
+def test_cell_tree_limit(ts4):
+    code = ts4.load_code_cell('tutorial01')
+    with pytest.raises(RuntimeError):
+        code.parse_tree(max_cells = 1)
+
+def test_empty_cell_stats(ts4):
+    cell = ts4.Cell(ts4.EMPTY_CELL)
+    assert ts4.eq(dict(depth = 0, cells = 1, bits = 0), cell.stats())
+    [node] = cell.parse_tree()
+    assert ts4.eq(cell.hash(), node['hash'])
+    assert ts4.eq([], node['refs'])
@@ -0,0 +1,65 @@
+import json
+import struct
+
+
+NOW = 1_600_000_000
+
+def state_lt(ts4, tmp_path):
+    # Logical time is stored in JSON metadata of the state file
+    fn = str(tmp_path / 'lt.state')
+    ts4.save_state(fn)
+    with open(fn, 'rb') as fp:
+        data = fp.read()
+    (size, ) = struct.unpack('<I', data[8:12])
+    return json.loads(data[12:12 + size])['lt']
+
+def snapshot(ts4, contract, tmp_path):
+    return dict(
+        balance  = contract.balance,
+        messages = len(ts4.get_all_messages(show_all = True)),
+        now      = ts4.core.get_now(),
+        trace    = ts4.get_last_trace(),
+        profile  = json.loads(ts4.core.get_profile()),
+        lt       = state_lt(ts4, tmp_path),
+    )
+
+def test_rollback_restores_state(ts4, tmp_path):
+    ts4.core.set_now(NOW)
+    ts4.set_trace_mode('ring', 10)
+    ts4.set_profiling(True)
+    try:
+        tut02 = ts4.BaseContract('tutorial02', {})
+        tut02.call_method('set_number', dict(value = 1))
+        before = snapshot(ts4, tut02, tmp_path)
+
+        ts4.core.begin_checkpoint()
+        ts4.core.set_now(NOW + 1000)
+        tut02.call_method('set_number', dict(value = 2))
+        assert ts4.eq(2, tut02.call_getter('m_number'))
+        assert before != snapshot(ts4, tut02, tmp_path)
+        ts4.core.rollback()
+
+        assert ts4.eq(before, snapshot(ts4, tut02, tmp_path))
+        assert ts4.eq(1, tut02.call_getter('m_number'))
+    finally:
+        ts4.set_profiling(False)
+        ts4.reset_profile()
+        ts4.set_trace_mode('off')
+
+def test_nested_checkpoints(ts4):
+    tut02 = ts4.BaseContract('tutorial02', {})
+    ts4.core.begin_checkpoint()
+    tut02.call_method('set_number', dict(value = 1))
+
+    # Dry run inside a checkpoint
+    result = tut02.call_method('set_number', dict(value = 3), dry_run = True)
+    assert ts4.eq(0, result.exit_code)
+    assert ts4.eq(1, tut02.call_getter('m_number'))
+
+    # Changes committed to the outer checkpoint are rolled back with it
+    ts4.core.begin_checkpoint()
+    tut02.call_method('set_number', dict(value = 2))
+    ts4.core.commit_checkpoint()
+    assert ts4.eq(2, tut02.call_getter('m_number'))
+    ts4.core.rollback()
+    assert ts4.eq(0, tut02.call_getter('m_number'))
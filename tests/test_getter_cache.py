@@ -0,0 +1,34 @@
+import pytest
+
+
+DAY = 86400
+
+@pytest.fixture
+def cache(ts4):
+    ts4.set_getter_cache(True)
+    yield
+    ts4.set_getter_cache(False)
+
+def test_getter_cache_hit(ts4, cache):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    assert ts4.eq(3735928559, tut01.call_getter('m_number'))
+    assert ts4.eq(3735928559, tut01.call_getter('m_number'))
+    stats = ts4.getter_cache_stats()
+    assert ts4.eq(1, stats['hits'])
+    assert ts4.eq(1, stats['misses'])
+
+def test_getter_cache_depends_on_now(ts4, cache):
+    now = 1_600_000_000
+    ts4.core.set_now(now)
+    tut07 = ts4.BaseContract('tutorial07', {})
+    assert ts4.eq(False, tut07.call_getter('isUnlocked'))
+    ts4.core.set_now(now + 7 * DAY)
+    assert ts4.eq(True, tut07.call_getter('isUnlocked'))
+    assert ts4.eq(0, ts4.getter_cache_stats()['hits'])
+
+def test_getter_cache_cleared_by_set_contract_abi(ts4, cache):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    tut01.call_getter('m_bool')
+    assert ts4.eq(1, ts4.getter_cache_stats()['entries'])
+    ts4.set_contract_abi(tut01, 'tutorial01')
+    assert ts4.eq(0, ts4.getter_cache_stats()['entries'])
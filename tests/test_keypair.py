@@ -0,0 +1,44 @@
+import copy
+import pickle
+
+import tonos_ts4.ts4 as ts4
+
+
+def make_keypair():
+    return ts4.KeyPair('a' * 128, '0x' + 'b' * 64)
+
+def test_keypair_deepcopy():
+    keypair = make_keypair()
+    keypair.handle_ = 7
+    keypair2 = copy.deepcopy(keypair)
+    assert isinstance(keypair2, ts4.KeyPair)
+    assert keypair2 == keypair
+    assert keypair2.handle_ is None
+
+def test_keypair_pickle():
+    keypair = make_keypair()
+    keypair.handle_ = 7
+    keypair2 = pickle.loads(pickle.dumps(keypair))
+    assert isinstance(keypair2, ts4.KeyPair)
+    assert keypair2 == keypair
+    (private_key, public_key) = keypair2
+    assert private_key == keypair.private_key
+    assert public_key == keypair.public_key
+    assert keypair2.handle_ is None
+
+def test_sign_cells(ts4):
+    keypair = ts4.make_keypair(seed = 1)
+    cells = ts4.encode_message_bodies('tutorial02', 'set_number', [dict(value = i) for i in range(3)])
+    signatures = ts4.sign_cells(cells, keypair)
+    assert ts4.eq(3, len(signatures))
+    assert ts4.eq(3, len(set(signatures)))
+    for (cell, signature) in zip(cells, signatures):
+        assert ts4.eq(ts4.sign_cell(cell, keypair), signature)
+    # Hexadecimal key gives the same signatures as the cached one
+    assert ts4.eq(signatures, ts4.sign_cells(cells, keypair.private_key))
+    assert ts4.eq([], ts4.sign_cells([], keypair))
+
+
+if __name__ == '__main__':
+    test_keypair_deepcopy()
+    test_keypair_pickle()
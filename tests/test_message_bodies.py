@@ -0,0 +1,26 @@
+def test_encode_message_bodies(ts4):
+    params = [dict(value = i) for i in range(5)]
+    bodies = ts4.encode_message_bodies('tutorial02', 'set_number', params)
+    assert ts4.eq(5, len(bodies))
+    for (p, body) in zip(params, bodies):
+        assert ts4.eq(ts4.encode_message_body('tutorial02', 'set_number', p), body)
+    assert ts4.eq(5, len(set(body.raw_ for body in bodies)))
+
+def test_body_cache(ts4):
+    ts4.set_body_cache(2)
+    try:
+        abi = ts4.Abi('tutorial02')
+        body1 = ts4.encode_message_body(abi, 'set_number', dict(value = 1))
+        assert ts4.eq(dict(hits = 0, misses = 1, entries = 1, size = 2), ts4.body_cache_stats())
+        assert body1 is ts4.encode_message_body(abi, 'set_number', dict(value = 1))
+        assert ts4.eq(1, ts4.body_cache_stats()['hits'])
+
+        # Only missing bodies are encoded, the least recently used one is evicted
+        bodies = ts4.encode_message_bodies(abi, 'set_number', [dict(value = 1), dict(value = 2), dict(value = 3)])
+        assert body1 is bodies[0]
+        assert ts4.eq(dict(hits = 2, misses = 3, entries = 2, size = 2), ts4.body_cache_stats())
+        assert body1 is not ts4.encode_message_body(abi, 'set_number', dict(value = 1))
+        assert ts4.eq(body1, ts4.encode_message_body(abi, 'set_number', dict(value = 1)))
+    finally:
+        ts4.set_body_cache(None)
+    assert ts4.body_cache_stats() is None
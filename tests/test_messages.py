@@ -0,0 +1,28 @@
+def deploy_neighbors(ts4):
+    contract1 = ts4.BaseContract('tutorial04_1', {})
+    contract2 = ts4.BaseContract('tutorial04_2', {})
+    return (contract1, contract2)
+
+def test_decode_internal_calls(ts4):
+    (contract1, contract2) = deploy_neighbors(ts4)
+    contract1.call_method('ping_neighbor', dict(neighbor = contract2.addr, value = 17))
+
+    msg = ts4.peek_msg()
+    assert msg.is_call('ping')
+    assert ts4.eq(17, int(msg.params['request']))
+    ts4.dispatch_one_message()
+    assert ts4.pop_event().is_event('ReceivedRequest', src = contract2.addr, dst = ts4.Address(None))
+
+    msg = ts4.peek_msg()
+    assert msg.is_call('pong')
+    assert ts4.eq(17, int(msg.params['reply']))
+    ts4.dispatch_one_message()
+    ts4.ensure_queue_empty()
+
+def test_decode_calls_after_reset(ts4):
+    # ABIs stay loaded after reset, but only ABIs of existing contracts are used for decoding
+    deploy_neighbors(ts4)
+    ts4.reset_all()
+    (contract1, contract2) = deploy_neighbors(ts4)
+    contract1.call_method('ping_neighbor', dict(neighbor = contract2.addr, value = 5))
+    assert ts4.peek_msg().is_call('ping')
@@ -0,0 +1,58 @@
+import json
+
+
+def test_profile_collapsed_stacks(ts4, tmp_path):
+    ts4.reset_profile()
+    ts4.set_profiling(True)
+    try:
+        tut02 = ts4.BaseContract('tutorial02', {})
+        tut02.call_method('set_number', dict(value = 1))
+        tut02.call_method('set_number', dict(value = 2))
+    finally:
+        ts4.set_profiling(False)
+
+    fn = str(tmp_path / 'gas.collapsed')
+    report = ts4.profile_report(collapsed = fn)
+    with open(fn) as f:
+        lines = f.read().splitlines()
+    assert len(lines) > 0
+    stacks = dict()
+    for line in lines:
+        (stack, gas) = line.rsplit(' ', 1)
+        assert stack not in stacks
+        stacks[stack] = int(gas)
+    assert sorted(stacks) == list(stacks)
+
+    # Every stack is attributed to its innermost function exactly once
+    assert len(report) > 0
+    self_gas = sum(gas for (stack, gas) in stacks.items() if ';' in stack)
+    assert ts4.eq(self_gas, sum(r['self_gas'] for r in report))
+    for r in report:
+        assert r['total_gas'] >= r['self_gas']
+    assert [r['total_gas'] for r in report] == sorted((r['total_gas'] for r in report), reverse = True)
+
+    ts4.reset_profile()
+    assert ts4.eq([], ts4.profile_report())
+
+def test_python_profiler_spans(ts4, tmp_path):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    profiler = ts4.set_profiler(ts4.Profiler())
+    try:
+        assert ts4.eq(True, tut01.call_getter('m_bool'))
+    finally:
+        ts4.set_profiler(None)
+    totals = profiler.totals()
+    assert ts4.eq('core', totals['core.call_contract']['category'])
+    assert ts4.eq(1, totals['core.call_contract']['calls'])
+    assert ts4.eq('python', totals['decode_contract_answer']['category'])
+
+    # Hooks are removed with the profiler
+    count = len(profiler.events)
+    tut01.call_getter('m_bool')
+    assert ts4.eq(count, len(profiler.events))
+
+    fn = str(tmp_path / 'trace.json')
+    profiler.save_chrome_trace(fn)
+    with open(fn) as f:
+        events = json.load(f)['traceEvents']
+    assert ts4.eq(count, len(events))
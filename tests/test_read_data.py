@@ -0,0 +1,17 @@
+import pytest
+
+
+def test_read_data_requires_fields(ts4):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    assert 'fields' not in tut01.abi.json
+    with pytest.raises(Exception, match = 'fields'):
+        tut01.read_data()
+
+def test_read_data_matches_getters(ts4):
+    tut01 = ts4.BaseContract('tutorial01', {})
+    if not tut01.abi.json.get('fields'):
+        pytest.skip('tutorial contracts are built without ABI `fields` section')
+    values = tut01.read_data()
+    for name in ['m_number', 'm_address', 'm_bool', 'm_bytes', 'm_string', 'm_array']:
+        assert ts4.eq(tut01.call_getter(name), values[name])
+    assert ts4.eq(tut01.call_getter('m_number'), tut01.read_data('m_number'))
@@ -0,0 +1,56 @@
+from tonos_ts4 import globals as g
+
+
+NOW = 1_600_000_000
+
+def test_save_load_state(ts4, tmp_path):
+    fn = str(tmp_path / 'all.state')
+    ts4.core.set_now(NOW)
+    tut02 = ts4.BaseContract('tutorial02', {}, nickname = 'tut02')
+    tut02.call_method('set_number', dict(value = 5))
+    balance = tut02.balance
+    ts4.save_state(fn)
+    with open(fn, 'rb') as fp:
+        assert ts4.eq(b'TS4STAT1', fp.read(8))
+
+    # Changes made after saving are discarded by loading
+    ts4.core.set_now(NOW + 100)
+    tut02.call_method('set_number', dict(value = 6))
+    tut01 = ts4.BaseContract('tutorial01', {})
+
+    ts4.load_state(fn)
+    assert ts4.eq(NOW, ts4.core.get_now())
+    assert ts4.eq(dict([(tut02.address.str(), 'tut02')]), g.NICKNAMES)
+    assert tut01.balance is None
+    assert ts4.eq([], ts4.get_all_messages(show_all = True))
+
+    wrapper = ts4.BaseContract('tutorial02', None, address = tut02.address)
+    assert ts4.eq(balance, wrapper.balance)
+    assert ts4.eq(5, wrapper.call_getter('m_number'))
+    wrapper.call_method('set_number', dict(value = 7))
+    assert ts4.eq(7, wrapper.call_getter('m_number'))
+
+def test_export_import_accounts(ts4, tmp_path):
+    tut02 = ts4.BaseContract('tutorial02', {})
+    tut02.call_method('set_number', dict(value = 5))
+    balance = tut02.balance
+    assert ts4.eq(1, ts4.export_accounts([tut02], str(tmp_path)))
+
+    ts4.reset_all()
+    tut01b = ts4.BaseContract('tutorial01', {})
+    assert ts4.eq([tut02.address], ts4.import_accounts(str(tmp_path)))
+    # Only exported accounts are imported, the rest of the state is kept
+    assert ts4.eq(balance, tut02.balance)
+    assert ts4.eq(5, tut02.call_getter('m_number'))
+    assert ts4.eq(True, tut01b.call_getter('m_bool'))
+
+def test_import_accounts_from_state_file(ts4, tmp_path):
+    fn = str(tmp_path / 'all.state')
+    tut01 = ts4.BaseContract('tutorial01', {})
+    tut02 = ts4.BaseContract('tutorial02', {})
+    ts4.save_state(fn)
+
+    ts4.reset_all()
+    addresses = ts4.import_accounts(fn)
+    assert ts4.eq(sorted([tut01.address.str(), tut02.address.str()]), sorted(a.str() for a in addresses))
+    assert ts4.eq(True, tut01.call_getter('m_bool'))
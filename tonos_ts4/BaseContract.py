@@ -1,4 +1,5 @@
 import os
+import copy
 
 from . import globals
 from . import ts4
@@ -6,6 +7,7 @@ from . import ts4
 from .address import *
 from .abi     import *
 from .global_functions import *
+from .metrics import start_span
 
 class BaseContract:
     """The :class:`BaseContract <BaseContract>` object, which is responsible
@@ -45,6 +47,7 @@ class BaseContract:
         self.name_ = name
         full_name = os.path.join(globals.G_TESTS_PATH, name)
         just_deployed = False
+        handle = None
         p_n = '' if nickname == None else f'({nickname})'
         if override_address is not None:
             Address.ensure_address(override_address)
@@ -73,9 +76,9 @@ class BaseContract:
                 assert pubkey[0:2] == '0x'
                 pubkey = pubkey.replace('0x', '')
             try:
-                address = globals.core.deploy_contract(
+                (address, handle) = globals.core.deploy_contract(
                     full_name + '.tvc',
-                    full_name + '.abi.json',
+                    self.abi.handle,
                     ts4.json_dumps(ctor_params) if ctor_params is not None else None,
                     ts4.json_dumps(initial_data) if initial_data is not None else None,
                     pubkey,
@@ -91,7 +94,7 @@ class BaseContract:
                 raise
             address = Address(address)
             just_deployed = True
-        self._init2(name, address, just_deployed = just_deployed)
+        self._init2(name, address, just_deployed = just_deployed, handle = handle)
         if nickname is not None:
             ts4.register_nickname(self.address, nickname)
 
@@ -99,13 +102,14 @@ class BaseContract:
     def abi_json(self):
         return self.abi.json
 
-    def _init2(self, name, address, nickname = None, just_deployed = False):
+    def _init2(self, name, address, nickname = None, just_deployed = False, handle = None):
         Address.ensure_address(address)
         self.addr_ = address
+        self._set_handle(handle)
         if not just_deployed:
             if globals.G_VERBOSE:
                 print(blue('Creating wrapper for ' + name))
-            globals.core.set_contract_abi(self.address.str(), self.abi.path_)
+            self._set_handle(globals.core.set_contract_abi(self.address.str(), self.abi.handle))
 
         if globals.G_ABI_FIXER is not None:
             ts4.fix_abi(self.name_, self.abi_json, globals.G_ABI_FIXER)
@@ -117,7 +121,18 @@ class BaseContract:
         :return: Account balance
         :rtype: num
         """
-        return ts4.get_balance(self.address)
+        return globals.core.get_balance(self._account())
+
+    def _set_handle(self, handle):
+        self.handle_ = handle
+        self.handle_epoch_ = globals.RESET_EPOCH
+
+    def _account(self):
+        # Core account handle saves address formatting and parsing on every call
+        if self.handle_epoch_ != globals.RESET_EPOCH:
+            # Handles are invalidated by `reset_all()`, the account may be recreated or loaded since
+            self._set_handle(globals.core.get_account_handle(self.addr_.str()))
+        return self.handle_ if self.handle_ is not None else self.addr_.str()
 
     @property
     def address(self):
@@ -151,7 +166,11 @@ class BaseContract:
         :return: Message parameters
         :rtype: JSON
         """
+        assert isinstance(expect_ec, int)
+        result = self._run_getter(method, params)
+        return self._process_getter_result(method, result, expect_ec)
 
+    def _run_getter(self, method, params, span = None, account = None):
         params = ts4.check_method_params(self.abi, method, params)
 
         if globals.G_VERBOSE and globals.G_SHOW_GETTERS:
@@ -160,18 +179,23 @@ class BaseContract:
 
         assert isinstance(method,    str)
         assert isinstance(params,    dict)
-        assert isinstance(expect_ec, int)
+
+        params = ts4.json_dumps(params)
+        if span: span.stage('encode')
 
         result = globals.core.call_contract(
-            self.addr.str(),
+            account if account is not None else self._account(),
             method,
             True,   # is_getter
             False,  # is_debot
-            ts4.json_dumps(params),
+            params,
             None,   # private_key
         )
+        if span: span.core()
 
-        result = ExecutionResult(result)
+        return ExecutionResult(result)
+
+    def _process_getter_result(self, method, result, expect_ec):
         assert eq(None, result.error)
         # print(actions)
 
@@ -186,8 +210,8 @@ class BaseContract:
             if not msg.is_answer():
                 raise Exception("Unexpected message type '{}' in getter output".format(msg.type))
 
-        assert eq(1, len(result.actions)), 'len(actions) == 1'
-        msg = Msg(json.loads(result.actions[0]))
+        assert eq(1, len(actions)), 'len(actions) == 1'
+        msg = actions[0]
         assert msg.is_answer(method)
 
         if globals.G_VERBOSE and globals.G_SHOW_GETTERS:
@@ -217,7 +241,20 @@ class BaseContract:
         :return: A returned value in decoded form (exact type depends on the type of getter)
         :rtype: type
         """
-        values = self.call_getter_raw(method, params, expect_ec)
+        account = self._account()
+        cache = globals.GETTER_CACHE
+        if cache is not None and expect_ec == 0:
+            decoder = either_or(decoder, ts4.decoder).fill_nones(ts4.decoder)
+            state = globals.core.get_state_hash(account)
+            cache_key = (method, ts4.json_dumps(params), key, decode, decoder.key())
+            answer = cache.get(account, state, cache_key)
+            if answer is not None:
+                return answer
+
+        assert isinstance(expect_ec, int)
+        span = start_span('getter', self._metrics_name(), method)
+        result = self._run_getter(method, params, span, account)
+        values = self._process_getter_result(method, result, expect_ec)
 
         if expect_ec > 0:
             # TODO: ensure values is empty?
@@ -237,9 +274,41 @@ class BaseContract:
 
         decoder = either_or(decoder, ts4.decoder).fill_nones(ts4.decoder)
 
-        # print('values =', values)
         answer = decode_contract_answer(self.abi, values, method, key, decoder)
-        return make_params(answer) if decode else answer
+        answer = make_params(answer) if decode else answer
+        if span: span.finish(result.gas_used)
+        if cache is not None and expect_ec == 0:
+            cache.put(account, state, cache_key, answer)
+        return answer
+
+    def read_data(self, fields = None, decoder = None):
+        """Decodes contract's persistent data directly from its data cell.
+        No getter is executed, so no gas is spent and nothing is added to the history.
+
+        :param fields: (optional) Name of a field or a list of names to be decoded.
+            All fields are decoded when not specified
+        :param Decoder decoder: Use this parameter to override decoding parameters
+        :return: A value of the field if `fields` is a string, otherwise a dictionary of values
+        :rtype: type
+        """
+        types = dict()
+        for abi_type in self.abi.find_data_types():
+            types[abi_type.name] = abi_type
+
+        values = json.loads(globals.core.read_data(self._account()))
+        decoder = either_or(decoder, ts4.decoder).fill_nones(ts4.decoder)
+
+        names = either_or(fields, list(values.keys()))
+        if isinstance(names, str):
+            names = [names]
+
+        res = dict()
+        for name in names:
+            if name not in values or name not in types:
+                raise Exception("Unknown data field '{}'".format(name))
+            res[name] = ts4.decode_json_value(values[name], types[name], decoder)
+
+        return res[fields] if isinstance(fields, str) else res
 
     def decode_event(self, event_msg):
         """Experimental feature. Decodes event parameters
@@ -264,14 +333,17 @@ class BaseContract:
         assert msg.is_event()
         dump_struct(self.abi.find_event_def(msg.event))
 
-    def call_method(self, method, params = dict(), private_key = None, expect_ec = 0, is_debot = False):
+    def call_method(self, method, params = dict(), private_key = None, expect_ec = 0, is_debot = False, dry_run = False):
         """Calls a given method.
 
         :param str method: Name of the method to be called
         :param dict params: A dictionary with parameters for calling the contract function
-        :param str private_key: A private key to be used to sign the message
+        :param private_key: A private key (or :class:`KeyPair <KeyPair>`) to be used to sign the message
         :param num expect_ec: Expected exit code. Use non-zero value
             if you expect a method to raise an exception
+        :param bool dry_run: Execute the call against the current state and return
+            :class:`DryRunResult <DryRunResult>` without committing anything
+            (balances, data, lt, queue and history stay intact). `expect_ec` is not checked
         :return: Value in decoded form (if method returns something)
         :rtype: dict
         """
@@ -284,17 +356,26 @@ class BaseContract:
             print(cyan(grey('    method: ') + bright_cyan('{}'.format(method))
             + grey('\n    params: ') + cyan('{}'.format(Params.stringify(prettify_dict(params))))) + '\n')
 
+        span = start_span('method', self._metrics_name(), method)
+
         params = ts4.check_method_params(self.abi, method, params)
+        params_str = ts4.json_dumps(params)
+        private_key = key_arg_(private_key)
+        if span: span.stage('encode')
+
+        if dry_run:
+            return self._dry_run_method(method, params_str, private_key, is_debot, span)
 
         try:
             result = globals.core.call_contract(
-                self.addr.str(),
+                self._account(),
                 method,
                 False, # is_getter
                 is_debot,
-                ts4.json_dumps(params),
+                params_str,
                 private_key,
             )
+            if span: span.core()
             result = ExecutionResult(result)
         except:
             if globals.G_VERBOSE:
@@ -322,12 +403,29 @@ class BaseContract:
                 assert answer.is_answer(method)
                 key = None
                 decoded_answer = decode_contract_answer(self.abi, answer.params, method, key, ts4.decoder)
+            if span: span.finish(result.gas_used)
             if globals.G_AUTODISPATCH:
                 ts4.dispatch_messages()
             if answer is not None:
                 return decoded_answer
 
 
+    def _dry_run_method(self, method, params, private_key, is_debot, span):
+        globals.core.begin_checkpoint()
+        try:
+            result = globals.core.call_contract(
+                self._account(), method, False, is_debot, params, private_key,
+            )
+            # TVM time is rolled back as well
+            if span: span.core()
+        finally:
+            globals.core.rollback()
+        result = DryRunResult(ExecutionResult(result))
+        if result.answer is not None and result.exit_code == 0:
+            result.value = decode_contract_answer(self.abi, result.answer.params, method, None, ts4.decoder)
+        if span: span.finish(result.gas_used)
+        return result
+
     def call_method_signed(self, method, params = dict(), expect_ec = 0):
         """Calls a given method using contract's private key.
 
@@ -349,12 +447,18 @@ class BaseContract:
         """
         if globals.G_VERBOSE:
             print('ticktock {}'.format(format_addr(self.address)))
-        result = globals.core.call_ticktock(self.address.str(), is_tock)
+        span = start_span('ticktock', self._metrics_name(), 'tock' if is_tock else 'tick')
+        result = globals.core.call_ticktock(self._account(), is_tock)
+        if span: span.core()
         result = ExecutionResult(result)
         gas, answer = ts4.process_actions(result)
         assert answer is None
+        if span: span.finish(gas)
         return gas
 
+    def _metrics_name(self):
+        return globals.NICKNAMES.get(self.addr.str(), self.name_)
+
     def create_keypair(self):
         assert False, red("create_keypair() is deprecated. Use 'keypair' parameter of BaseContract's constructor instead")
 
@@ -368,6 +472,104 @@ class BaseContract:
         return (self.private_key_, self.public_key_)
 
 
+class GetterCache:
+    """The :class:`GetterCache <GetterCache>` object, which stores decoded getter answers.
+    Answers are bound to the account state hash and balance, current time and
+    config params, so any change of them made by the core invalidates the answers.
+
+    :ivar num hits: Number of answers served from the cache
+    :ivar num misses: Number of getters actually executed
+    """
+    def __init__(self):
+        self.entries_   = dict()
+        self.hits       = 0
+        self.misses     = 0
+
+    def get(self, addr, state, key):
+        entry = self.entries_.get(addr)
+        if entry is not None and entry[0] == state and key in entry[1]:
+            self.hits += 1
+            return copy.deepcopy(entry[1][key])
+        self.misses += 1
+        return None
+
+    def put(self, addr, state, key, answer):
+        if answer is None:
+            return
+        entry = self.entries_.get(addr)
+        if entry is None or entry[0] != state:
+            entry = (state, dict())
+            self.entries_[addr] = entry
+        entry[1][key] = copy.deepcopy(answer)
+
+    def forget(self, addr):
+        self.entries_.pop(addr, None)
+
+    def clear(self):
+        self.entries_ = dict()
+
+    def stats(self):
+        return dict(
+            hits    = self.hits,
+            misses  = self.misses,
+            entries = sum(len(e[1]) for e in self.entries_.values()),
+        )
+
+def set_getter_cache(enabled = True):
+    """Enables or disables caching of getter answers in `BaseContract.call_getter()`.
+    Cached answers are invalidated automatically when the account changes.
+
+    :param bool enabled: Toggle for getter cache
+    """
+    globals.GETTER_CACHE = GetterCache() if enabled else None
+
+def getter_cache_stats():
+    """Returns getter cache counters.
+
+    :return: Dictionary with `hits`, `misses` and `entries` counters or None if cache is disabled
+    :rtype: dict
+    """
+    cache = globals.GETTER_CACHE
+    return cache.stats() if cache is not None else None
+
+def call_getters(calls, decoder = None, threads = 1):
+    """Calls a batch of getters in a single core call and decodes the answers.
+    Useful for checking invariants over a large number of contracts.
+
+    :param list calls: A list of `(contract, method[, params[, expect_ec]])` tuples.
+        Use non-zero `expect_ec` if you expect a getter to raise an exception
+    :param Decoder decoder: Use this parameter to override decoding parameters
+    :param num threads: Number of threads used to execute the getters
+    :return: A list of decoded answers in the same order as `calls`
+        (`None` for getters with non-zero `expect_ec`)
+    :rtype: list
+    """
+    calls = list(calls)
+    requests = []
+    for call in calls:
+        contract, method = call[0], call[1]
+        params = call[2] if len(call) > 2 else dict()
+        assert isinstance(contract, BaseContract)
+        assert isinstance(method, str)
+        params = ts4.check_method_params(contract.abi, method, params)
+        requests.append((contract._account(), method, ts4.json_dumps(params)))
+
+    results = globals.core.call_getters(requests, threads)
+
+    decoder = either_or(decoder, ts4.decoder).fill_nones(ts4.decoder)
+
+    answers = []
+    for call, result in zip(calls, results):
+        contract, method = call[0], call[1]
+        expect_ec = call[3] if len(call) > 3 else 0
+        assert isinstance(expect_ec, int)
+        values = contract._process_getter_result(method, ExecutionResult(result), expect_ec)
+        if expect_ec > 0:
+            answers.append(None)
+            continue
+        answers.append(decode_contract_answer(contract.abi, values, method, None, decoder))
+    return answers
+
 def _make_tuple_result(abi, method, values, decoder):
     types = abi.find_getter_output_types(method)
     res_dict = {}
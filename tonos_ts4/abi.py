@@ -14,6 +14,17 @@ class Abi:
         self.path_ = ts4.make_path(contract_name, '.abi.json')
         with open(self.path_, 'rb') as fp:
             self.json = json.load(fp)
+        self.handle_ = None
+        self.input_types_ = dict()
+
+    @property
+    def handle(self):
+        """Handle of the ABI loaded into the core. The core parses the file
+        again only when its content has changed.
+        """
+        if self.handle_ is None:
+            self.handle_ = globals.core.load_abi(self.path_)
+        return self.handle_
 
     def find_abi_method(self, method):
         for rec in self.json['functions']:
@@ -21,6 +32,32 @@ class Abi:
                 return rec
         return None
 
+    def find_input_types(self, method):
+        """Returns types of the inputs of a given method (or of the static
+        members when method is `.data`). Result is cached per method.
+        """
+        types = self.input_types_.get(method)
+        if types is None:
+            if method == '.data':
+                inputs = self.json['data']
+            else:
+                func = self.find_abi_method(method)
+                if func is None:
+                    raise Exception("Unknown method name '{}'".format(method))
+                inputs = func['inputs']
+            types = [AbiType(param) for param in inputs]
+            self.input_types_[method] = types
+        return types
+
+    def find_data_types(self):
+        """Returns types of the persistent contract data described by `fields` section
+        of the ABI. Raises an exception if there is no such section.
+        """
+        fields = self.json.get('fields')
+        if not fields:
+            raise Exception("ABI '{}' has no `fields` section describing contract data".format(self.path_))
+        return [AbiType(t) for t in fields]
+
     def find_getter_output_types(self, method):
         rec = self.find_abi_method(method)
         assert rec is not None
@@ -122,24 +159,17 @@ def check_method_params(abi, method, params):
     assert isinstance(abi, Abi)
 
     # ts4.verbose('check_method_params {}'.format(params))
-    if method == '.data':
-        inputs = abi.json['data']
-    else:
-        func = abi.find_abi_method(method)
-        if func is None:
-            raise Exception("Unknown method name '{}'".format(method))
-        inputs = func['inputs']
     res = {}
-    for param in inputs:
-        pname = param['name']
+    for abi_type in abi.find_input_types(method):
+        pname = abi_type.name
         if pname not in params:
             # ts4.verbose('Raising exception')
             if globals.G_VERBOSE:
                 print('params =', params)
             raise Exception("Parameter '{}' is missing when calling method '{}'".format(pname, method))
-        # ts4.dump_struct(param)
+        # ts4.dump_struct(abi_type)
         # ts4.dump_struct(params[pname])
-        res[pname] = check_param_names_rec(params[pname], AbiType(param))
+        res[pname] = check_param_names_rec(params[pname], abi_type)
     return res
 
 def _raise_type_mismatch(expected_type, value, abi_type):
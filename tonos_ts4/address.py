@@ -1,4 +1,5 @@
 import json
+import base64
 
 from . import globals
 from . import ts4
@@ -122,14 +123,90 @@ class Bytes():
 
 class Cell():
     """The :class:`Cell <Cell>` object, which represents a cell.
+    The cell is kept in its serialized (BOC) form and converted to base64 only when needed.
     """
     def __init__(self, value):
         """Constructs :class:`Cell <Cell>` object.
 
-        :param str value: A base64 string representing the cell
+        :param value: A base64 string or a bytes-like object (`bytes`, `bytearray`,
+            `memoryview`) containing serialized cell
         """
-        assert isinstance(value, str)
-        self.raw_ = value
+        if isinstance(value, str):
+            self.b64_  = value
+            self.data_ = None
+        else:
+            assert isinstance(value, (bytes, bytearray, memoryview)), \
+                'Unexpected cell value: {}'.format(type(value))
+            self.b64_  = None
+            self.data_ = value if isinstance(value, bytes) else bytes(value)
+        self.hash_  = None
+        self.stats_ = None
+        self.tree_  = None
+
+    @property
+    def raw_(self):
+        """Base64 representation of the cell"""
+        if self.b64_ is None:
+            self.b64_ = base64.b64encode(self.data_).decode('utf-8')
+        return self.b64_
+
+    @raw_.setter
+    def raw_(self, value):
+        self.b64_   = value
+        self.data_  = None
+        self.hash_  = None
+        self.stats_ = None
+        self.tree_  = None
+
+    def to_bytes(self):
+        """Returns serialized cell.
+
+        :return: Serialized cell
+        :rtype: bytes
+        """
+        if self.data_ is None:
+            return base64.b64decode(self.b64_)
+        return self.data_
+
+    def core_arg_(self):
+        # `bytes` are borrowed by the core without copying
+        return either_or(self.data_, self.b64_)
+
+    def hash(self):
+        """Returns representation hash of the cell.
+
+        :return: Hexadecimal string representing the hash
+        :rtype: str
+        """
+        if self.hash_ is None:
+            self.hash_ = globals.core.cell_hash(self.core_arg_())
+        return self.hash_
+
+    def stats(self):
+        """Returns statistics of the cells tree: `depth`, number of unique `cells`
+        and their total size in `bits`.
+
+        :return: Dictionary with statistics
+        :rtype: dict
+        """
+        if self.stats_ is None:
+            (depth, cells, bits) = globals.core.cell_stats(self.core_arg_())
+            self.stats_ = dict(depth = depth, cells = cells, bits = bits)
+        return self.stats_
+
+    def parse_tree(self, max_cells = 100_000):
+        """Returns unique cells of the tree, the root cell goes first. Every cell
+        is a dictionary with `hash`, `bits`, `data` (hexadecimal string) and `refs`
+        (indices of the referenced cells in the returned list).
+
+        :param num max_cells: Maximal number of unique cells, an exception is raised
+            for larger trees
+        :return: List of cells
+        :rtype: list
+        """
+        if self.tree_ is None:
+            self.tree_ = json.loads(globals.core.cell_parse_tree(self.core_arg_(), max_cells))
+        return self.tree_
 
     def __str__(self):
         return self.__repr__()
@@ -139,16 +216,63 @@ class Cell():
 
     def __eq__(self, other):
         if isinstance(other, Cell):
-            return self.raw_ == other.raw_
+            if self.data_ is not None and other.data_ is not None:
+                if self.data_ == other.data_:
+                    return True
+            elif self.b64_ is not None and self.b64_ == other.b64_:
+                return True
+            try:
+                return self.hash() == other.hash()
+            except Exception:
+                # Malformed cell or no core, differently serialized cells cannot be compared
+                return False
         return False
 
+    def __hash__(self):
+        return hash(self.hash())
+
     def is_empty(self):
         """Checks if the cell is empty.
 
         :return: Result of check
         :rtype: bool
         """
-        return globals.EMPTY_CELL == self.raw_
+        return self == Cell(globals.EMPTY_CELL)
+
+
+class KeyPair(tuple):
+    """The :class:`KeyPair <KeyPair>` object, which is a `(private_key, public_key)` tuple.
+    Its private key is parsed by the core only once and then passed by handle.
+    """
+    def __new__(cls, private_key, public_key):
+        return super().__new__(cls, (private_key, public_key))
+
+    def __init__(self, private_key, public_key):
+        self.handle_ = None
+
+    def __reduce__(self):
+        # Core handle is process-local, so it is not copied or pickled
+        return (KeyPair, (self[0], self[1]))
+
+    @property
+    def private_key(self):
+        return self[0]
+
+    @property
+    def public_key(self):
+        return self[1]
+
+    @property
+    def handle(self):
+        """Handle of the parsed key in the core"""
+        if self.handle_ is None:
+            self.handle_ = globals.core.register_keypair(self[0])
+        return self.handle_
+
+
+def key_arg_(private_key):
+    # Keys are parsed and cached by the core, so either form is accepted
+    return private_key.handle if isinstance(private_key, KeyPair) else private_key
 
 
 class Msg:
@@ -353,6 +477,36 @@ class ExecutionResult:
         self.gas_used   = gas
         self.error      = err
 
+class DryRunResult:
+    """The :class:`DryRunResult <DryRunResult>` object, which contains the result of
+    an execution that was not committed. Note that IDs of these messages are not valid.
+
+    :ivar num exit_code: Exit code of the transaction
+    :ivar num gas_used: The amount of gas spent
+    :ivar str error: Error (`no_accept`, `no_account`, ...) or None
+    :ivar list messages: Outbound internal messages (:class:`Msg <Msg>`)
+    :ivar list events: Emitted events (:class:`Msg <Msg>`)
+    :ivar Msg answer: Answer message, if any
+    :ivar value: Decoded answer (filled by `call_method()`)
+    """
+    def __init__(self, result):
+        assert isinstance(result, ExecutionResult)
+        self.exit_code  = result.exit_code
+        self.gas_used   = result.gas_used
+        self.error      = result.error
+        self.messages   = []
+        self.events     = []
+        self.answer     = None
+        self.value      = None
+        for j in result.actions:
+            msg = Msg(json.loads(j))
+            if msg.is_event():
+                self.events.append(msg)
+            elif msg.is_answer():
+                self.answer = msg
+            else:
+                self.messages.append(msg)
+
 def prettify_dict(d, max_str_len = 67):
     nd = {}
     for k, v in d.items():
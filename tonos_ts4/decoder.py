@@ -34,6 +34,9 @@ class Decoder:
     def defaults():
         return Decoder(ints = True, strings = True, tuples = True)
         
+    def key(self):
+        return (self.ints, self.strings, self.tuples, tuple(self.skip_fields))
+
     def fill_nones(self, other):
         return Decoder(
                 ints        = either_or(self.ints,        other.ints),
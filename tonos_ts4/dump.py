@@ -38,9 +38,9 @@ def _fix_large_ints(v):
         return v
     return transform_structure(v, transform_value)
 
-def json_dumps(j):
+def json_dumps(j, sort_keys = False):
     j = _fix_large_ints(j)
-    return json.dumps(j) #, cls = JsonEncoder)
+    return json.dumps(j, sort_keys = sort_keys) #, cls = JsonEncoder)
 
 
 #########################################################################################################
@@ -94,6 +94,38 @@ def dump_message(msg: Msg):
         print(ttt)
 
 
+#########################################################################################################
+
+def dump_last_trace(max_steps = 50):
+    """Dumps the tail of the last transaction trace to the console.
+
+    :param num max_steps: Maximal number of steps to be printed
+    """
+    trace = get_last_trace() or []
+    print(white('Trace ({} steps recorded):'.format(len(trace))))
+    for step in trace[-max_steps:]:
+        func = step['func'] if step['func'] is not None else 'n/a'
+        print(grey('  {:>6}: '.format(step['id'])) + cyan(step['cmd']) +
+            grey('  gas: {}, func: '.format(step['gas'])) + bright_cyan(func))
+    if len(trace) > 0 and len(trace[-1]['stack']) > 0:
+        print(grey('  stack:'))
+        for item in trace[-1]['stack']:
+            print(grey('    ') + item)
+
+def dump_profile(max_rows = 30):
+    """Prints the table returned by `profile_report()`.
+
+    :param num max_rows: Maximal number of rows to be printed
+    """
+    rows = profile_report()
+    print(white('{:<20} {:<30} {:>12} {:>12} {:>12} {:>12}'.format(
+        'contract', 'function', 'self instr', 'self gas', 'total instr', 'total gas')))
+    for r in rows[:max_rows]:
+        print('{:<20} {:<30} {:>12} {:>12} {:>12} {:>12}'.format(
+            r['contract'], r['function'], r['self_instructions'], r['self_gas'],
+            r['total_instructions'], r['total_gas']))
+
+
 #########################################################################################################
 
 def dump_js_data():
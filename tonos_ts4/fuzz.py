@@ -0,0 +1,321 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+import re
+import time
+import random
+import string
+
+from . import globals
+from . import ts4
+
+from .util    import *
+from .address import *
+from .abi     import *
+
+
+class FuzzFailure:
+    """The :class:`FuzzFailure <FuzzFailure>` object, which describes a failed case.
+
+    :ivar str kind: `exit_code`, `error`, `invariant` or `exception`
+    :ivar str message: Description of the failure
+    :ivar dict params: Parameters of the first failed case
+    :ivar dict shrunk: Minimized parameters that still fail the same way
+    :ivar num count: Number of cases failed the same way
+    """
+    def __init__(self, kind, message, params):
+        self.kind       = kind
+        self.message    = message
+        self.params     = params
+        self.shrunk     = params
+        self.count      = 1
+
+    def __repr__(self):
+        return 'FuzzFailure({}: {}, shrunk = {}, count = {})'.format(
+            self.kind, self.message, self.shrunk, self.count)
+
+
+class FuzzReport:
+    """The :class:`FuzzReport <FuzzReport>` object, which contains fuzzing results.
+
+    :ivar num cases: Number of executed cases
+    :ivar dict exit_codes: Number of cases per exit code
+    :ivar list failures: Unique failures (:class:`FuzzFailure <FuzzFailure>`)
+    :ivar num elapsed: Time spent, in seconds
+    """
+    def __init__(self):
+        self.cases      = 0
+        self.exit_codes = dict()
+        self.failures   = []
+        self.elapsed    = 0
+
+    @property
+    def cases_per_sec(self):
+        return self.cases / self.elapsed if self.elapsed > 0 else None
+
+    def ok(self):
+        return len(self.failures) == 0
+
+
+class Fuzzer:
+    """The :class:`Fuzzer <Fuzzer>` object, which calls a contract method with random
+    ABI-typed parameters. Every case is executed against the same state: changes are
+    rolled back in the core, so nothing is redeployed.
+    """
+    def __init__(self,
+        contract,
+        method,
+        invariant   = None,
+        expect_ec   = (0,),
+        private_key = None,
+        dispatch    = False,
+        seed        = None,
+        max_len     = 8,
+    ):
+        """Constructs :class:`Fuzzer <Fuzzer>` object.
+
+        :param BaseContract contract: Contract to be called
+        :param str method: Name of the method
+        :param invariant: (optional) A callable `invariant(contract, params, result)` that
+            is called after each case (before rollback), so it can use getters.
+            Returning False or raising AssertionError is treated as a violation
+        :param expect_ec: Collection of exit codes which are not treated as failures
+        :param str private_key: Key used to sign messages. Contract's key is used by default
+        :param bool dispatch: Dispatch all the internal messages produced by a case
+        :param num seed: Seed for the random generator
+        :param num max_len: Maximal length of generated arrays, maps and strings
+        """
+        self.contract_      = contract
+        self.method_        = method
+        self.types_         = contract.abi.find_input_types(method)
+        self.invariant_     = invariant
+        self.expect_ec_     = set(expect_ec)
+        self.private_key_   = key_arg_(either_or(private_key, contract.private_key_))
+        self.dispatch_      = dispatch
+        self.random_        = random.Random(seed)
+        self.max_len_       = max_len
+
+    def run(self, cases = 1000, shrink = True):
+        """Executes a given number of random cases.
+
+        :param num cases: Number of cases
+        :param bool shrink: Minimize parameters of failed cases
+        :return: Fuzzing results
+        :rtype: FuzzReport
+        """
+        report = FuzzReport()
+        failures = dict()
+        start = time.perf_counter()
+        for _ in range(cases):
+            params = {t.name: self.generate(t) for t in self.types_}
+            (ec, failure) = self.execute(params)
+            report.cases += 1
+            report.exit_codes[ec] = report.exit_codes.get(ec, 0) + 1
+            if failure is None:
+                continue
+            key = failure[:2]
+            if key in failures:
+                failures[key].count += 1
+            else:
+                failures[key] = FuzzFailure(failure[0], failure[1], params)
+        if shrink:
+            for (key, failure) in failures.items():
+                failure.shrunk = self.shrink(failure.params, key)
+        report.failures = list(failures.values())
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    def execute(self, params):
+        """Executes a single case and rolls the state back.
+
+        :param dict params: Method parameters
+        :return: Exit code and failure tuple `(kind, message)` or None
+        :rtype: tuple
+        """
+        core = globals.core
+        core.begin_checkpoint()
+        try:
+            try:
+                params_str = ts4.json_dumps(check_method_params(self.contract_.abi, self.method_, params))
+                result = core.call_contract(
+                    self.contract_._account(), self.method_, False, False, params_str, self.private_key_,
+                )
+            except Exception as err:
+                return (None, ('exception', str(err)))
+            result = DryRunResult(ExecutionResult(result))
+            ec = result.exit_code
+            if result.error is not None:
+                return (ec, ('error', result.error))
+            if ec not in self.expect_ec_:
+                return (ec, ('exit_code', 'unexpected exit code {}'.format(ec)))
+            if self.dispatch_:
+                failure = self._dispatch(result.messages)
+                if failure is not None:
+                    return (ec, failure)
+            if self.invariant_ is not None:
+                try:
+                    if self.invariant_(self.contract_, params, result) is False:
+                        return (ec, ('invariant', 'invariant returned False'))
+                except AssertionError as err:
+                    return (ec, ('invariant', str(err)))
+            return (ec, None)
+        finally:
+            core.rollback()
+
+    def _dispatch(self, msgs):
+        queue = list(msgs)
+        while len(queue) > 0:
+            msg = queue.pop(0)
+            if msg.dst.is_none():
+                continue
+            result = DryRunResult(ExecutionResult(globals.core.dispatch_message(msg.id)))
+            if result.error is not None:
+                return ('error', result.error)
+            if result.exit_code not in self.expect_ec_:
+                return ('exit_code', 'unexpected exit code {} in {}'.format(
+                    result.exit_code, msg.method if msg.is_call() else msg.type))
+            queue += result.messages
+        return None
+
+    def generate(self, abi_type):
+        """Generates a random value of a given ABI type.
+
+        :param AbiType abi_type: Type of the value
+        :return: A value suitable for `call_method()`
+        """
+        rnd = self.random_
+        type = abi_type.type
+
+        if abi_type.is_array():
+            type2 = abi_type.remove_array()
+            return [self.generate(type2) for _ in range(rnd.randint(0, self.max_len_))]
+
+        bounds = _int_bounds(type)
+        if bounds is not None:
+            (lo, hi) = bounds
+            # Edge values are much more likely to reveal bugs
+            edges = [lo, hi, 0, 1, hi - 1]
+            if lo < 0:
+                edges += [-1, lo + 1]
+            if rnd.random() < 0.3:
+                return min(max(rnd.choice(edges), lo), hi)
+            return rnd.randint(lo, hi) >> rnd.randint(0, hi.bit_length())
+
+        if type == 'bool':
+            return rnd.random() < 0.5
+        if type == 'address':
+            return rnd.choice([
+                self.contract_.addr,
+                Address('0:' + '0' * 64),
+                Address('0:{:064x}'.format(rnd.getrandbits(256))),
+            ])
+        if type == 'cell':
+            return Cell(globals.EMPTY_CELL)
+        if type in ['string', 'bytes']:
+            n = rnd.randint(0, self.max_len_)
+            return ''.join(rnd.choice(string.printable) for _ in range(n))
+        if type == 'tuple':
+            return {c.name: self.generate(c) for c in abi_type.components}
+
+        m = re.match(r'^map\((.*),(.*)\)$', type)
+        if m:
+            key_type = AbiType(dict(name = None, type = m.group(1)))
+            val_type = create_AbiType(m.group(2), abi_type)
+            res = dict()
+            for _ in range(rnd.randint(0, self.max_len_)):
+                key = self.generate(key_type)
+                res[key.str() if isinstance(key, Address) else key] = self.generate(val_type)
+            return res
+
+        m = re.match(r'^optional\((.*)\)$', type)
+        if m:
+            if rnd.random() < 0.3:
+                return None
+            return self.generate(create_AbiType(m.group(1), abi_type))
+
+        raise Exception("Unsupported type to fuzz '{}'".format(type))
+
+    def shrink(self, params, key, max_steps = 200):
+        """Greedily minimizes parameters while the case fails with the same failure.
+
+        :param dict params: Parameters of a failed case
+        :param tuple key: Failure `(kind, message)` to be preserved
+        :return: Minimized parameters
+        :rtype: dict
+        """
+        steps = 0
+        improved = True
+        while improved and steps < max_steps:
+            improved = False
+            for candidate in _shrink_value(params):
+                steps += 1
+                if self.execute(candidate)[1] == key:
+                    params = candidate
+                    improved = True
+                    break
+                if steps >= max_steps:
+                    break
+        return params
+
+
+def _int_bounds(type):
+    m = re.match(r'^(u)?int(\d+)$', type)
+    if m:
+        bits = int(m.group(2))
+        return (0, 2**bits - 1) if m.group(1) else (-2**(bits - 1), 2**(bits - 1) - 1)
+    m = re.match(r'^var(u)?int(\d+)$', type)
+    if m:
+        bits = 8 * (int(m.group(2)) - 1)
+        return (0, 2**bits - 1) if m.group(1) else (-2**(bits - 1), 2**(bits - 1) - 1)
+    if type == 'gram':
+        return (0, 2**120 - 1)
+    return None
+
+def _shrink_value(value):
+    """Yields simpler variants of a value"""
+    if isinstance(value, bool) or value is None:
+        if value:
+            yield False
+        return
+    if isinstance(value, int):
+        if value != 0:
+            yield 0
+            yield value // 2 if value > 0 else -((-value) // 2)
+        return
+    if isinstance(value, str):
+        if len(value) > 0:
+            yield ''
+            yield value[:len(value) // 2]
+        return
+    if isinstance(value, list):
+        for i in range(len(value)):
+            yield value[:i] + value[i + 1:]
+        for i in range(len(value)):
+            for v in _shrink_value(value[i]):
+                yield value[:i] + [v] + value[i + 1:]
+        return
+    if isinstance(value, dict):
+        for k in value.keys():
+            for v in _shrink_value(value[k]):
+                res = dict(value)
+                res[k] = v
+                yield res
+        return
+
+def fuzz(contract, method, cases = 1000, **kwargs):
+    """Fuzzes a contract method with random ABI-typed parameters.
+    See :class:`Fuzzer <Fuzzer>` for the list of parameters.
+
+    :param BaseContract contract: Contract to be called
+    :param str method: Name of the method
+    :param num cases: Number of cases
+    :return: Fuzzing results
+    :rtype: FuzzReport
+    """
+    return Fuzzer(contract, method, **kwargs).run(cases)
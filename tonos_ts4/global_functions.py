@@ -1,6 +1,8 @@
 import os
 import base64
+from glob import glob
 import hashlib
+from collections import OrderedDict
 
 from . import globals as g
 from .globals import GRAM, EMPTY_CELL
@@ -26,6 +28,10 @@ def reset_all():
     g.EVENTS          = []
     g.ALL_MESSAGES    = []
     g.NICKNAMES       = dict()
+    g.G_TRACE_MODE    = 'off'
+    g.RESET_EPOCH    += 1
+    if g.GETTER_CACHE is not None:
+        g.GETTER_CACHE.clear()
 
 def set_tests_path(path):
     """Sets the directory where the system will look for compiled contracts.
@@ -34,7 +40,7 @@ def set_tests_path(path):
     """
     g.G_TESTS_PATH = path
 
-def init(path, verbose = False, time = None):
+def init(path, verbose = False, time = None, clock = None):
     """Initializes the library.
 
     :param str path: Directory where the artifacts of the used contracts are located
@@ -42,6 +48,9 @@ def init(path, verbose = False, time = None):
     :param num time: Time in seconds (unixtime).
         TS4 uses either real-clock or virtual time. Once you set time you switch
         to the virtual time mode.
+    :param str clock: How real-clock mode stamps external messages.
+        `monotonic` (default) assigns strictly increasing millisecond timestamps,
+        `sleep` lets the ABI use the wall clock and sleeps 1ms per call
     """
     script_path = os.path.dirname(sys.argv[0])
     path = os.path.join(
@@ -50,6 +59,8 @@ def init(path, verbose = False, time = None):
     )
     set_tests_path(path)
     set_verbose(verbose)
+    if clock is not None:
+        g.core.set_clock_mode(clock)
     if time is not None:
         g.core.set_now(time)
 
@@ -61,6 +72,77 @@ def set_verbose(verbose = True):
     """
     g.G_VERBOSE = verbose
 
+def set_trace_mode(mode, depth = None):
+    """Sets what is recorded while contracts are executed.
+    The recorded trace is dumped automatically when a transaction exits
+    with an unexpected exit code.
+
+    :param str mode: One of `off`, `ring` (last `depth` VM steps),
+        `functions` (only transitions between functions) or `full`
+    :param num depth: Number of steps kept in `ring` mode (1000 by default)
+    """
+    g.core.set_trace_mode(mode, depth)
+    g.G_TRACE_MODE = mode
+
+def get_last_trace():
+    """Returns trace of the last executed transaction recorded according to the trace mode.
+
+    :return: List of steps with `id`, `cmd`, `gas`, `func` and `stack` fields
+    :rtype: list
+    """
+    return json.loads(g.core.get_last_trace())
+
+def set_profiling(enabled = True):
+    """Enables or disables the gas and instruction profiler.
+    The profile is accumulated across all runs (and is kept by `reset_all()`)
+    until `reset_profile()` is called. Function names are resolved via `.debug.json` files.
+
+    :param bool enabled: Toggle for profiling mode
+    """
+    g.core.set_profiling(enabled)
+
+def reset_profile():
+    """Clears the accumulated profile.
+    """
+    g.core.reset_profile()
+
+def profile_report(collapsed = None):
+    """Returns the accumulated profile as a table with one row per contract function.
+    `self_*` values count only the instructions executed in the function itself,
+    `total_*` values include all functions called from it.
+
+    :param str collapsed: If given, the collapsed stacks (`contract;func1;func2 gas`)
+        are written to this file. The format is accepted by `flamegraph.pl` and speedscope
+    :return: List of rows with `contract`, `function`, `self_instructions`, `self_gas`,
+        `total_instructions` and `total_gas` fields sorted by total gas
+    :rtype: list
+    """
+    profile = json.loads(g.core.get_profile())
+    if collapsed is not None:
+        with open(collapsed, 'w') as f:
+            for stack, (_, gas) in sorted(profile.items()):
+                print('{} {}'.format(stack, gas), file = f)
+    rows = dict()
+    def row(contract, func):
+        key = (contract, func)
+        if key not in rows:
+            rows[key] = dict(contract = contract, function = func,
+                self_instructions = 0, self_gas = 0, total_instructions = 0, total_gas = 0)
+        return rows[key]
+    for stack, (count, gas) in profile.items():
+        contract, *funcs = stack.split(';')
+        if len(funcs) == 0:
+            continue
+        r = row(contract, funcs[-1])
+        r['self_instructions'] += count
+        r['self_gas'] += gas
+        # recursive functions are counted once per stack
+        for func in set(funcs):
+            r = row(contract, func)
+            r['total_instructions'] += count
+            r['total_gas'] += gas
+    return sorted(rows.values(), key = lambda r: (-r['total_gas'], r['contract'], r['function']))
+
 def set_stop_at_crash(do_stop):
     """Sets `G_STOP_AT_CRASH` global flag.
     By default the system stops at the first exception (unexpected exit code) raised by a contract.
@@ -217,7 +299,7 @@ def gen_addr(name, initial_data = None, keypair = None, wc = 0):
 
     result = ts4.core.gen_addr(
             make_path(name, '.tvc'),
-            abi.path_,
+            abi.handle,
             ts4.json_dumps(initial_data) if initial_data is not None else None,
             pubkey,
             private_key,
@@ -230,7 +312,7 @@ def make_keypair(seed = None):
 
     :param str seed: Seed to be used to generate keys. Useful when constant keypair is needed
     :return: The key pair
-    :rtype: (str, str)
+    :rtype: KeyPair
     """
     if isinstance(seed, str):
         hash = hashlib.sha256(seed.encode('utf-8'))
@@ -238,7 +320,7 @@ def make_keypair(seed = None):
         seed = seed % (2**64)
     (secret_key, public_key) = globals.core.make_keypair(seed)
     public_key = '0x' + public_key
-    return (secret_key, public_key)
+    return KeyPair(secret_key, public_key)
 
 def save_keypair(keypair, filename):
     """Saves keypair to file.
@@ -260,13 +342,13 @@ def load_keypair(filename):
 
     :param str filename: File name
     :return: The loaded keypair
-    :rtype: (str, str)
+    :rtype: KeyPair
     """
     with open(filename, 'rt') as f:
         j = json.load(f)
     public = j['public']
     secret = j['secret']
-    return (secret, '0x' + public)
+    return KeyPair(secret, '0x' + public)
 
 def make_path(name, ext):
     fn = os.path.join(globals.G_TESTS_PATH, name)
@@ -275,7 +357,6 @@ def make_path(name, ext):
             fn += ext
     return fn
 
-# TODO: Shouldn't this function return Cell?
 def load_tvc(fn):
     """Loads a compiled contract image (`.tvc`) with a given name.
 
@@ -284,9 +365,17 @@ def load_tvc(fn):
     :rtype: Cell
     """
     fn = make_path(fn, '.tvc')
+    return load_boc(fn)
+
+def load_boc(fn):
+    """Loads a serialized cell (`.boc`) from a given file.
+
+    :param str fn: The file name
+    :return: Cell object loaded from a given file
+    :rtype: Cell
+    """
     with open(fn, 'rb') as fp:
-        str = base64.b64encode(fp.read(1_000_000)).decode('utf-8')
-        return Cell(str)
+        return Cell(fp.read())
 
 def load_code_cell(fn):
     """Loads contract code cell from a compiled contract image with a given name.
@@ -308,6 +397,21 @@ def load_data_cell(fn):
     fn = make_path(fn, '.tvc')
     return Cell(globals.core.load_data_cell(fn))
 
+def preload_debug_info():
+    """Loads debug info (`.debug.json`) of all contracts located in the tests path,
+    so that traced runs do not read these files during execution.
+
+    :return: Names of the contracts with loaded debug info
+    :rtype: list
+    """
+    loaded = []
+    for fn in sorted(glob(os.path.join(g.G_TESTS_PATH, '*.debug.json'))):
+        name = os.path.basename(fn)[:-len('.debug.json')]
+        tvc = make_path(name, '.tvc')
+        if os.path.exists(tvc) and g.core.preload_debug_info(tvc):
+            loaded.append(name)
+    return loaded
+
 def grams(n):
     return '{:.3f}'.format(n / GRAM).replace('.000', '')
 
@@ -339,38 +443,129 @@ def register_abi(contract_name):
     fn = make_path(contract_name, '.abi.json')
     if globals.G_VERBOSE:
         print(blue("Loading ABI " + fn))
-    globals.core.set_contract_abi(None, fn)
+    globals.core.set_contract_abi(None, globals.core.load_abi(fn))
+
+def _check_private_key(private_key):
+    if not isinstance(private_key, KeyPair):
+        assert isinstance(private_key, str)
+        assert eq(128, len(private_key))
+        # TODO: check that it is hexadecimal number
+    return key_arg_(private_key)
 
 def sign_cell(cell, private_key):
     """Signs cell with a given key and returns signature.
 
     :param Cell value: Cell to be signed
-    :param str private_key: Hexadecimal representation of 1024-bits long private key
+    :param private_key: Hexadecimal representation of 1024-bits long private key or :class:`KeyPair <KeyPair>`
     :return: Hexadecimal string representing resulting signature
     :rtype: str
     """
     assert isinstance(cell, Cell)
-    assert isinstance(private_key, str)
-    assert eq(128, len(private_key))
-    # TODO: check that it is hexadecimal number
-    return globals.core.sign_cell(cell.raw_, private_key)
+    return globals.core.sign_cell(cell.core_arg_(), _check_private_key(private_key))
+
+def sign_cells(cells, private_key):
+    """Signs a batch of cells with a given key in a single core call.
+
+    :param list cells: Cells to be signed
+    :param private_key: Hexadecimal representation of 1024-bits long private key or :class:`KeyPair <KeyPair>`
+    :return: Hexadecimal strings representing resulting signatures
+    :rtype: list
+    """
+    args = []
+    for cell in cells:
+        assert isinstance(cell, Cell)
+        args.append(cell.core_arg_())
+    return globals.core.sign_cells(args, _check_private_key(private_key))
+
+class BodyCache:
+    """The :class:`BodyCache <BodyCache>` object, which keeps recently encoded
+    message bodies. Entries are keyed by ABI, method and canonical JSON of parameters.
+
+    :ivar num hits: Number of bodies served from the cache
+    :ivar num misses: Number of bodies actually encoded
+    """
+    def __init__(self, size):
+        self.size_      = size
+        self.entries_   = OrderedDict()
+        self.hits       = 0
+        self.misses     = 0
+
+    def get(self, key):
+        cell = self.entries_.get(key)
+        if cell is None:
+            self.misses += 1
+            return None
+        self.entries_.move_to_end(key)
+        self.hits += 1
+        return cell
+
+    def put(self, key, cell):
+        self.entries_[key] = cell
+        if len(self.entries_) > self.size_:
+            self.entries_.popitem(last = False)
+
+    def clear(self):
+        self.entries_.clear()
+
+    def stats(self):
+        return dict(
+            hits    = self.hits,
+            misses  = self.misses,
+            entries = len(self.entries_),
+            size    = self.size_,
+        )
+
+def set_body_cache(size = 1024):
+    """Enables or disables LRU cache of message bodies encoded by `encode_message_body()`
+    and `encode_message_bodies()`.
+
+    :param num size: Maximal number of cached bodies. Use 0 or None to disable the cache
+    """
+    g.BODY_CACHE = BodyCache(size) if size else None
+
+def body_cache_stats():
+    """Returns message body cache counters.
+
+    :return: Dictionary with `hits`, `misses`, `entries` and `size` or None if cache is disabled
+    :rtype: dict
+    """
+    cache = g.BODY_CACHE
+    return cache.stats() if cache is not None else None
 
 def encode_message_body(abi_name, method, params):
     """Encode given message body.
 
-    :param str abi_name: The contract name the ABI of which should be used for encoding
+    :param abi_name: The contract name the ABI of which should be used for encoding or :class:`Abi <Abi>` object
     :param str method: A name of the encoded method
     :param dict params: A dictionary with parameters for the encoded method
     :return: Cell object containing encoded message
     :rtype: Cell
     """
-    abi_file = make_path(abi_name, '.abi.json')
-    encoded = globals.core.encode_message_body(
-        abi_file,
-        method,
-        ts4.json_dumps(params)
-    )
-    return Cell(encoded)
+    return encode_message_bodies(abi_name, method, [params])[0]
+
+def encode_message_bodies(abi_name, method, params_list):
+    """Encodes a batch of message bodies of the same method in a single core call.
+
+    :param abi_name: The contract name the ABI of which should be used for encoding or :class:`Abi <Abi>` object
+    :param str method: A name of the encoded method
+    :param list params_list: A list of dictionaries with parameters for the encoded method
+    :return: A list of Cell objects containing encoded messages
+    :rtype: list
+    """
+    abi = abi_name.handle if isinstance(abi_name, Abi) else make_path(abi_name, '.abi.json')
+    params_list = [ts4.json_dumps(params, sort_keys = True) for params in params_list]
+    cache = g.BODY_CACHE
+    if cache is None:
+        return [Cell(body) for body in globals.core.encode_message_bodies(abi, method, params_list)]
+
+    cells = [cache.get((abi, method, params)) for params in params_list]
+    missing = [i for (i, cell) in enumerate(cells) if cell is None]
+    if len(missing) > 0:
+        bodies = globals.core.encode_message_bodies(abi, method, [params_list[i] for i in missing])
+        for (i, body) in zip(missing, bodies):
+            cells[i] = Cell(body)
+            cache.put((abi, method, params_list[i]), cells[i])
+    return cells
 
 def set_config_param(index, value):
     """Sets global config parameter.
@@ -379,13 +574,66 @@ def set_config_param(index, value):
     :param Cell value: Cell object containing desired value.
     """
     assert isinstance(value, Cell)
-    globals.core.set_config_param(index, value.raw_)
+    globals.core.set_config_param(index, value.core_arg_())
 
 #########################################################################################################
 
 def get_all_runs():
     return json.loads(globals.core.get_all_runs())
 
+def save_state(filename):
+    """Saves the entire emulator state to a file: accounts (StateInit, balance and ABI),
+    dummy balances, config params, time, logical time and nicknames.
+    Message history and the queue of unprocessed messages are not saved.
+
+    :param str filename: File name
+    """
+    extra = json.dumps(dict(nicknames = g.NICKNAMES))
+    g.core.save_state(filename, extra)
+
+def load_state(filename):
+    """Replaces the emulator state with one saved by `save_state()`.
+    Contract wrappers can then be created with `BaseContract(name, None, address = ...)`.
+
+    :param str filename: File name
+    """
+    reset_all()
+    extra = g.core.load_state(filename)
+    if extra is not None:
+        g.NICKNAMES = json.loads(extra).get('nicknames', dict())
+
+def _accounts_file(dir_or_file):
+    if os.path.isdir(dir_or_file):
+        return os.path.join(dir_or_file, 'accounts.ts4state')
+    return dir_or_file
+
+def export_accounts(addresses, dir_or_file):
+    """Exports given accounts (StateInit, balance and ABI) to a file in a single core call.
+
+    :param list addresses: Addresses (:class:`Address <Address>`) or contracts (:class:`BaseContract <BaseContract>`)
+    :param str dir_or_file: File name or a directory where `accounts.ts4state` is created
+    :return: Number of exported accounts
+    :rtype: num
+    """
+    accounts = []
+    for addr in addresses:
+        if isinstance(addr, ts4.BaseContract):
+            accounts.append(addr._account())
+        else:
+            Address.ensure_address(addr)
+            accounts.append(addr.str())
+    return g.core.export_accounts(accounts, _accounts_file(dir_or_file))
+
+def import_accounts(dir_or_file):
+    """Imports accounts exported by `export_accounts()` (or all the accounts of a `save_state()` file)
+    into the current state. Existing accounts with the same addresses are replaced.
+
+    :param str dir_or_file: File name or a directory containing `accounts.ts4state`
+    :return: Addresses of imported accounts
+    :rtype: list
+    """
+    return [Address(addr) for addr in g.core.import_accounts(_accounts_file(dir_or_file))]
+
 #########################################################################################################
 
 def fix_abi(name, abi, callback):
@@ -406,8 +654,11 @@ def set_contract_abi(contract, new_abi_name):
     """
     assert isinstance(contract, ts4.BaseContract)
 
+    # Cached answers were decoded with the old ABI
+    if g.GETTER_CACHE is not None:
+        g.GETTER_CACHE.forget(contract._account())
     contract.abi = Abi(new_abi_name)
-    globals.core.set_contract_abi(contract.addr.str(), contract.abi.path_)
+    contract._set_handle(globals.core.set_contract_abi(contract.addr.str(), contract.abi.handle))
 
 
 #########################################################################################################
@@ -28,20 +28,40 @@ G_STOP_ON_NO_ACCOUNT = True
 G_STOP_ON_NO_FUNDS 	= True
 G_CHECK_ABI_TYPES	= True
 G_AUTODISPATCH      = False
+G_TRACE_MODE        = 'off'
+
+# Incremented by `reset_all()`, which invalidates core account handles
+RESET_EPOCH     = 0
 
 G_ABI_FIXER     = None
 
+GETTER_CACHE    = None
+BODY_CACHE      = None
+METRICS         = None
+PROFILER        = None
+
 
 PACKAGE_DIR = os.path.basename(os.path.dirname(__file__))
 CORE = '.' + sys.platform + '.linker_lib'
 
-try:
-    core = importlib.import_module(CORE, PACKAGE_DIR)
-except ImportError as err:
-    print('Error: {}'.format(err))
-    exit()
-except:
-    print('Unsupported platform:', sys.platform)
-    exit()
+class CoreLoader:
+    """Loads the native core on first use, so importing the package is cheap.
+    Loaded functions are cached as attributes of the loader.
+    """
+    def __init__(self):
+        self.module_ = None
+
+    def load(self):
+        if self.module_ is None:
+            try:
+                self.module_ = importlib.import_module(CORE, PACKAGE_DIR)
+            except ImportError as err:
+                raise Exception('Cannot load TS4 core for platform {}: {}'.format(sys.platform, err)) from err
+        return self.module_
 
+    def __getattr__(self, name):
+        attr = getattr(self.load(), name)
+        setattr(self, name, attr)
+        return attr
 
+core = CoreLoader()
@@ -0,0 +1,189 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+import io
+import csv
+import json
+import time
+
+from . import globals
+
+
+class Histogram:
+    """The :class:`Histogram <Histogram>` object, which accumulates values
+    into power-of-two buckets.
+    """
+    def __init__(self):
+        self.count   = 0
+        self.sum     = 0
+        self.min     = None
+        self.max     = None
+        self.buckets = dict()
+
+    def add(self, value):
+        self.count += 1
+        self.sum   += value
+        self.min    = value if self.min is None else min(self.min, value)
+        self.max    = value if self.max is None else max(self.max, value)
+        bound = 1
+        while bound < value:
+            bound *= 2
+        self.buckets[bound] = self.buckets.get(bound, 0) + 1
+
+    def to_dict(self):
+        return dict(
+            count   = self.count,
+            sum     = self.sum,
+            min     = self.min,
+            max     = self.max,
+            mean    = self.sum / self.count if self.count > 0 else None,
+            buckets = {str(k): v for k, v in sorted(self.buckets.items())},
+        )
+
+
+class Span:
+    """Measures a single call. Stages are measured between consecutive marks.
+    """
+    def __init__(self, metrics, kind, contract, method):
+        self.metrics_   = metrics
+        self.key_       = (kind, contract, method)
+        self.t0_        = time.perf_counter()
+        self.t_         = self.t0_
+        self.stages_    = dict()
+
+    def stage(self, name):
+        """Attributes the time elapsed since the previous mark to a given stage.
+
+        :param str name: Name of the stage (`encode`, `decode`, ...)
+        """
+        t = time.perf_counter()
+        self.stages_[name] = self.stages_.get(name, 0) + t - self.t_
+        self.t_ = t
+
+    def core(self):
+        """Marks the end of a core call. Its time is split into `tvm` and `ffi` stages.
+        """
+        t = time.perf_counter()
+        tvm = globals.core.get_last_tvm_time() / 1e6
+        self.stages_['tvm'] = self.stages_.get('tvm', 0) + tvm
+        self.stages_['ffi'] = self.stages_.get('ffi', 0) + max(0, t - self.t_ - tvm)
+        self.t_ = t
+
+    def finish(self, gas = None):
+        """Finishes the span and stores it.
+
+        :param num gas: Gas used by the transaction
+        """
+        self.stage('decode')
+        self.metrics_.add(self.key_, time.perf_counter() - self.t0_, self.stages_, gas)
+
+
+class Metrics:
+    """The :class:`Metrics <Metrics>` object, which collects execution metrics
+    keyed by call kind, contract and method. Times are stored in microseconds.
+    """
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.calls_         = dict()
+        self.queue_depth_   = []
+        self.messages_      = 0
+        self.dispatch_time_ = 0
+        self.started_       = time.perf_counter()
+
+    def start(self, kind, contract, method):
+        return Span(self, kind, contract, method)
+
+    def add(self, key, total, stages, gas):
+        if key not in self.calls_:
+            self.calls_[key] = dict()
+        hists = self.calls_[key]
+        values = dict(total = total, **stages)
+        for name, value in values.items():
+            hists.setdefault('time_' + name, Histogram()).add(int(value * 1e6))
+        if gas is not None:
+            hists.setdefault('gas', Histogram()).add(gas)
+        if key[0] == 'dispatch':
+            self.messages_      += 1
+            self.dispatch_time_ += total
+            self.queue_depth_.append(len(globals.QUEUE))
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started_
+        calls = []
+        for (kind, contract, method), hists in self.calls_.items():
+            calls.append(dict(
+                kind        = kind,
+                contract    = contract,
+                method      = method,
+                metrics     = {name: h.to_dict() for name, h in hists.items()},
+            ))
+        return dict(
+            calls               = calls,
+            queue_depth         = self.queue_depth_,
+            messages            = self.messages_,
+            messages_per_second = self.messages_ / elapsed if elapsed > 0 else None,
+            dispatch_rate       = self.messages_ / self.dispatch_time_ if self.dispatch_time_ > 0 else None,
+        )
+
+    def to_csv(self):
+        f = io.StringIO()
+        writer = csv.writer(f)
+        writer.writerow(['kind', 'contract', 'method', 'metric', 'count', 'sum', 'min', 'max', 'mean'])
+        for (kind, contract, method), hists in self.calls_.items():
+            for name, h in hists.items():
+                d = h.to_dict()
+                writer.writerow([kind, contract, method, name,
+                    d['count'], d['sum'], d['min'], d['max'], d['mean']])
+        return f.getvalue()
+
+
+def start_span(kind, contract, method):
+    """Starts measuring a call if metrics are enabled.
+
+    :return: A span or None if metrics are disabled
+    :rtype: Span
+    """
+    m = globals.METRICS
+    return m.start(kind, contract, method) if m is not None else None
+
+def set_metrics(enabled = True):
+    """Enables or disables collection of execution metrics.
+    Collected metrics are dropped when disabled.
+
+    :param bool enabled: Toggle for metrics collection
+    """
+    globals.METRICS = Metrics() if enabled else None
+
+def metrics(format = None, filename = None):
+    """Returns execution metrics collected for `call_method()`, `call_getter()`,
+    `ticktock()` and `dispatch_one_message()`: gas and wall time histograms
+    (split into `encode`, `ffi`, `tvm` and `decode` stages), queue depth history
+    and message dispatch rates.
+
+    :param str format: `None` to return a dictionary, `json` or `csv` to return a string
+    :param str filename: (optional) File to write the exported metrics to
+    :return: Collected metrics
+    :rtype: dict or str
+    """
+    m = globals.METRICS
+    assert m is not None, 'Metrics are disabled. Use `ts4.set_metrics()` to enable them'
+    if format is None:
+        return m.summary()
+    if format == 'json':
+        res = json.dumps(m.summary(), indent = 2)
+    elif format == 'csv':
+        res = m.to_csv()
+    else:
+        raise Exception("Unknown metrics format '{}'".format(format))
+    if filename is not None:
+        with open(filename, 'w') as f:
+            f.write(res)
+    return res
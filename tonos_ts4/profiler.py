@@ -0,0 +1,155 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+import os
+import sys
+import json
+import time
+import functools
+
+from . import globals
+
+
+# Python-side stages wrapped when a profiler is set: (module, attribute)
+STAGES = [
+    ('abi',             'check_method_params'),
+    ('dump',            'json_dumps'),
+    ('decoder',         'decode_json_value'),
+    ('BaseContract',    'decode_contract_answer'),
+    ('ts4',             'process_actions'),
+]
+
+class Profiler:
+    """The :class:`Profiler <Profiler>` object, which collects timing spans
+    reported by `set_profiler()` hooks.
+
+    :ivar list events: Collected spans as `(name, category, start, duration)` tuples.
+        Time is measured in seconds by `time.perf_counter()`
+    """
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, name, category, start, duration):
+        self.events.append((name, category, start, duration))
+
+    def clear(self):
+        self.events = []
+
+    def totals(self):
+        """Returns total time and number of calls per span name.
+
+        :return: A dictionary `name -> dict(category, calls, time)` sorted by time
+        :rtype: dict
+        """
+        res = dict()
+        for (name, category, _, duration) in self.events:
+            t = res.setdefault(name, dict(category = category, calls = 0, time = 0))
+            t['calls'] += 1
+            t['time']  += duration
+        return dict(sorted(res.items(), key = lambda kv: -kv[1]['time']))
+
+    def save_chrome_trace(self, filename):
+        """Writes collected spans in Chrome trace-event format
+        (viewable in `chrome://tracing` or Perfetto).
+
+        :param str filename: Name of the file to be written
+        """
+        pid = os.getpid()
+        events = [dict(
+            name    = name,
+            cat     = category,
+            ph      = 'X',
+            ts      = start * 1e6,
+            dur     = duration * 1e6,
+            pid     = pid,
+            tid     = 0,
+        ) for (name, category, start, duration) in self.events]
+        with open(filename, 'w') as f:
+            json.dump(dict(traceEvents = events, displayTimeUnit = 'ms'), f)
+
+
+def _timed(fn, name, category):
+    active = [0]    # recursive calls are reported once
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        callback = globals.PROFILER
+        if callback is None or active[0] > 0:
+            return fn(*args, **kwargs)
+        active[0] += 1
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            active[0] -= 1
+            callback(name, category, start, time.perf_counter() - start)
+    wrapper.ts4_original_ = fn
+    return wrapper
+
+
+class _CoreProxy:
+    def __init__(self, core):
+        self.core_ = core
+        self.wrappers_ = dict()
+
+    def __getattr__(self, name):
+        if name not in self.wrappers_:
+            attr = getattr(self.core_, name)
+            if not callable(attr):
+                return attr
+            self.wrappers_[name] = _timed(attr, 'core.' + name, 'core')
+        return self.wrappers_[name]
+
+
+def _package_modules():
+    prefix = __package__ + '.'
+    return [m for (name, m) in list(sys.modules.items()) if name.startswith(prefix) and m is not None]
+
+def _install():
+    core = globals.core
+    proxy = _CoreProxy(core)
+    wrappers = dict()
+    for (module, attr) in STAGES:
+        fn = getattr(sys.modules[__package__ + '.' + module], attr)
+        wrappers[id(fn)] = _timed(fn, attr, 'python')
+    for m in _package_modules():
+        if getattr(m, 'core', None) is core:
+            m.core = proxy
+        for attr, value in list(vars(m).items()):
+            if id(value) in wrappers:
+                setattr(m, attr, wrappers[id(value)])
+    from .address import Msg
+    Msg.__init__ = _timed(Msg.__init__, 'Msg', 'python')
+
+def _uninstall():
+    for m in _package_modules():
+        if isinstance(getattr(m, 'core', None), _CoreProxy):
+            m.core = m.core.core_
+        for attr, value in list(vars(m).items()):
+            if hasattr(value, 'ts4_original_'):
+                setattr(m, attr, value.ts4_original_)
+    from .address import Msg
+    Msg.__init__ = Msg.__init__.ts4_original_
+
+def set_profiler(callback):
+    """Sets a hook that receives timing spans of every core entry point
+    (`core.*`, category `core`) and of Python-side encoding and decoding stages
+    (`check_method_params`, `json_dumps`, `decode_json_value`,
+    `decode_contract_answer`, `process_actions` and `Msg` construction, category `python`).
+    Spans may nest: e.g. `process_actions` includes construction of `Msg` objects.
+
+    :param callback: A callable `callback(name, category, start, duration)`, e.g.
+        a :class:`Profiler <Profiler>` object. Use None to remove the hook
+    :return: The callback
+    """
+    if callback is not None and globals.PROFILER is None:
+        _install()
+    if callback is None and globals.PROFILER is not None:
+        _uninstall()
+    globals.PROFILER = callback
+    return callback
@@ -0,0 +1,162 @@
+"""
+    This file is part of TON OS.
+
+    TON OS is free software: you can redistribute it and/or modify
+    it under the terms of the Apache License 2.0 (http://www.apache.org/licenses/)
+
+    Copyright 2019-2021 (c) TON LABS
+"""
+
+'''
+
+    Process-parallel runner for ts4 scripts.
+
+        python -m tonos_ts4.run tests/                          # all test*.py files
+        python -m tonos_ts4.run tutorials --pattern 'tutorial*.py' -j 8
+        python -m tonos_ts4.run tests/ --functions --report report.json
+
+    By default every script is a job and it is executed as `__main__`.
+    With `--functions` every top-level `test*()` function becomes a job: the
+    script's top-level code (e.g. `ts4.init()` and deployment) is executed
+    first in a fresh state and then a single test function is called.
+    Every job runs in a fresh worker process with its own core instance.
+
+'''
+
+import os
+import io
+import sys
+import ast
+import json
+import time
+import glob
+import runpy
+import argparse
+import traceback
+import contextlib
+import multiprocessing
+
+
+def discover(paths, pattern, functions):
+    """Returns a list of jobs `(path, function)`. `function` is None for whole scripts."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, '**', pattern), recursive = True))
+        else:
+            files.append(path)
+    jobs = []
+    for fn in files:
+        fn = os.path.abspath(fn)
+        if not functions:
+            jobs.append((fn, None))
+            continue
+        with open(fn) as f:
+            tree = ast.parse(f.read(), fn)
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef) and node.name.startswith('test') \
+                    and len(node.args.args) == len(node.args.defaults):
+                jobs.append((fn, node.name))
+    return jobs
+
+def run_job(job):
+    """Executes a single job in a fresh emulator state. Runs in a worker process."""
+    import tonos_ts4.ts4 as ts4
+
+    (path, func) = job
+    ts4.reset_all()
+    ts4.decoder = ts4.Decoder.defaults()
+    ts4.set_verbose(False)
+
+    cwd  = os.getcwd()
+    argv = sys.argv
+    sys.argv = [path]
+    os.chdir(os.path.dirname(path))
+
+    output = io.StringIO()
+    error  = None
+    start  = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            run_name = '__main__' if func is None else '__ts4_run__'
+            ns = runpy.run_path(path, run_name = run_name)
+            if func is not None:
+                ns[func]()
+    except SystemExit as err:
+        if err.code not in [None, 0]:
+            error = 'SystemExit({})'.format(err.code)
+    except BaseException:
+        error = traceback.format_exc()
+    finally:
+        os.chdir(cwd)
+        sys.argv = argv
+    elapsed = time.perf_counter() - start
+
+    runs = ts4.get_all_runs()
+    return dict(
+        path    = path,
+        func    = func,
+        passed  = error is None,
+        error   = error,
+        elapsed = elapsed,
+        runs    = len(runs),
+        gas     = sum(r['gas'] for r in runs),
+        exit_codes = sorted(set(r['exit_code'] for r in runs)),
+        output  = output.getvalue(),
+    )
+
+def job_name(res):
+    name = os.path.relpath(res['path'])
+    return name if res['func'] is None else '{}::{}'.format(name, res['func'])
+
+def main():
+    parser = argparse.ArgumentParser(prog = 'python -m tonos_ts4.run',
+        description = 'Runs ts4 scripts in parallel processes')
+    parser.add_argument('paths', nargs = '+', help = 'Scripts or directories')
+    parser.add_argument('--pattern', default = 'test*.py', help = 'File pattern used in directories (test*.py)')
+    parser.add_argument('--functions', action = 'store_true',
+        help = 'Run each top-level test*() function as a separate job')
+    parser.add_argument('-j', '--jobs', type = int, default = os.cpu_count(), help = 'Number of worker processes')
+    parser.add_argument('--report', help = 'Write JSON report to this file')
+    parser.add_argument('-v', '--verbose', action = 'store_true', help = 'Print output of all jobs')
+    args = parser.parse_args()
+
+    jobs = discover(args.paths, args.pattern, args.functions)
+    if len(jobs) == 0:
+        print('No tests found')
+        sys.exit(1)
+
+    start = time.perf_counter()
+    results = []
+    # A fresh worker per job: scripts leave behind ts4 settings, caches and imported helper modules
+    with multiprocessing.Pool(max(1, min(args.jobs, len(jobs))), maxtasksperchild = 1) as pool:
+        for res in pool.imap_unordered(run_job, jobs):
+            results.append(res)
+            status = 'PASSED' if res['passed'] else 'FAILED'
+            print('{:<6} {} ({:.2f}s, {} runs, gas {})'.format(
+                status, job_name(res), res['elapsed'], res['runs'], res['gas']))
+            if args.verbose or not res['passed']:
+                print(res['output'], end = '')
+            if not res['passed']:
+                print(res['error'])
+    elapsed = time.perf_counter() - start
+
+    results.sort(key = lambda r: (r['path'], r['func'] or ''))
+    failed = [r for r in results if not r['passed']]
+
+    print('\nGas report (top 10):')
+    for r in sorted(results, key = lambda r: -r['gas'])[:10]:
+        print('  {:>14}  {}'.format(r['gas'], job_name(r)))
+    print('\n{} passed, {} failed in {:.2f}s ({} workers); total gas {}'.format(
+        len(results) - len(failed), len(failed), elapsed,
+        max(1, min(args.jobs, len(jobs))), sum(r['gas'] for r in results)))
+
+    if args.report is not None:
+        with open(args.report, 'w') as f:
+            json.dump(dict(elapsed = elapsed, results = results), f, indent = 2)
+
+    sys.exit(1 if len(failed) > 0 else 0)
+
+
+if __name__ == '__main__':
+    main()
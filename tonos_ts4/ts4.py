@@ -8,14 +8,8 @@
 """
 
 import sys
-import base64
-import secrets
 import json
-import numbers
-import re
-import copy
 import os.path
-from glob import glob
 
 from .util      import *
 from .address   import *
@@ -25,7 +19,11 @@ from .dump      import *
 from .global_functions  import *
 
 from .globals       import core
-from .BaseContract  import BaseContract, decode_contract_answer
+from .BaseContract  import BaseContract, decode_contract_answer, call_getters, \
+    set_getter_cache, getter_cache_stats
+from .metrics       import set_metrics, metrics, start_span
+from .profiler      import Profiler, set_profiler
+from .fuzz          import Fuzzer, fuzz
 
 __version__ = version()
 
@@ -44,6 +42,8 @@ def check_exitcode(expected_ec, real_ec):
         if xtra is not None:
             xtra = ': ' + xtra
         verbose_('{}{}'.format(globals.core.get_last_error_msg(), xtra))
+        if globals.G_TRACE_MODE != 'off':
+            dump_last_trace()
     assert eq(expected_ec, real_ec, dismiss = not globals.G_STOP_AT_CRASH)
 
 def process_actions(result: ExecutionResult, expect_ec = 0):
@@ -131,12 +131,35 @@ def dispatch_one_message(expect_ec = 0):
     if msg.dst.is_none():
         # TODO: a getter's reply. Add a test for that
         return
+    span = start_span('dispatch', globals.NICKNAMES.get(msg.dst.str(), msg.dst.str()),
+        msg.method if msg.is_call() else msg.type)
     result = globals.core.dispatch_message(msg.id)
+    if span: span.core()
     result = ExecutionResult(result)
     gas, answer = process_actions(result, expect_ec)
     assert answer is None
+    if span: span.finish(gas)
     return gas
 
+def dry_run_dispatch(msg = None):
+    """Executes a message from the queue against the current state without
+    committing anything: the message stays in the queue, and balances, data, lt
+    and history are not changed.
+
+    :param Msg msg: A message from the queue. The first one is used if not specified
+    :return: Result of the execution
+    :rtype: DryRunResult
+    """
+    if msg is None:
+        msg = peek_msg()
+    assert not msg.dst.is_none()
+    globals.core.begin_checkpoint()
+    try:
+        result = globals.core.dispatch_message(msg.id)
+    finally:
+        globals.core.rollback()
+    return DryRunResult(ExecutionResult(result))
+
 
 #########################################################################################################
 